@@ -41,7 +41,7 @@ class Ui_MainWindow(object):
         spacerItem = QtGui.QSpacerItem(0, 0, QtGui.QSizePolicy.MinimumExpanding, QtGui.QSizePolicy.Minimum)
         self.horizontalLayout.addItem(spacerItem)
         self.verticalLayout.addLayout(self.horizontalLayout)
-        self.existingTextureList = QtGui.QTableWidget(self.filesTab)
+        self.existingTextureList = QtGui.QTableView(self.filesTab)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
@@ -52,16 +52,6 @@ class Ui_MainWindow(object):
         self.existingTextureList.setSelectionMode(QtGui.QAbstractItemView.MultiSelection)
         self.existingTextureList.setSelectionBehavior(QtGui.QAbstractItemView.SelectRows)
         self.existingTextureList.setObjectName("existingTextureList")
-        self.existingTextureList.setColumnCount(4)
-        self.existingTextureList.setRowCount(0)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(0, item)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(1, item)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(2, item)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(3, item)
         self.existingTextureList.horizontalHeader().setDefaultSectionSize(200)
         self.existingTextureList.horizontalHeader().setMinimumSectionSize(90)
         self.existingTextureList.horizontalHeader().setStretchLastSection(True)
@@ -113,6 +103,14 @@ class Ui_MainWindow(object):
         self.updatePath.setChecked(True)
         self.updatePath.setObjectName("updatePath")
         self.horizontalLayout_2.addWidget(self.updatePath)
+        self.deduplicate = QtGui.QCheckBox(self.filesTab)
+        self.deduplicate.setChecked(False)
+        self.deduplicate.setObjectName("deduplicate")
+        self.horizontalLayout_2.addWidget(self.deduplicate)
+        self.dryRun = QtGui.QCheckBox(self.filesTab)
+        self.dryRun.setChecked(False)
+        self.dryRun.setObjectName("dryRun")
+        self.horizontalLayout_2.addWidget(self.dryRun)
         self.verticalLayout.addLayout(self.horizontalLayout_2)
         self.actionButtonsLayout = QtGui.QHBoxLayout()
         self.actionButtonsLayout.setObjectName("actionButtonsLayout")
@@ -122,6 +120,9 @@ class Ui_MainWindow(object):
         self.move = QtGui.QPushButton(self.filesTab)
         self.move.setObjectName("move")
         self.actionButtonsLayout.addWidget(self.move)
+        self.link = QtGui.QPushButton(self.filesTab)
+        self.link.setObjectName("link")
+        self.actionButtonsLayout.addWidget(self.link)
         self.search = QtGui.QPushButton(self.filesTab)
         self.search.setObjectName("search")
         self.actionButtonsLayout.addWidget(self.search)
@@ -133,6 +134,21 @@ class Ui_MainWindow(object):
         self.cancel.setObjectName("cancel")
         self.actionButtonsLayout.addWidget(self.cancel)
         self.verticalLayout.addLayout(self.actionButtonsLayout)
+        self.searchProgressFrame = QtGui.QWidget(self.filesTab)
+        self.searchProgressFrame.setObjectName("searchProgressFrame")
+        self.searchProgressLayout = QtGui.QHBoxLayout(self.searchProgressFrame)
+        self.searchProgressLayout.setContentsMargins(0, 0, 0, 0)
+        self.searchProgressLayout.setObjectName("searchProgressLayout")
+        self.searchProgress = QtGui.QProgressBar(self.searchProgressFrame)
+        self.searchProgress.setObjectName("searchProgress")
+        self.searchProgressLayout.addWidget(self.searchProgress)
+        self.searchStatus = QtGui.QLabel(self.searchProgressFrame)
+        self.searchStatus.setObjectName("searchStatus")
+        self.searchProgressLayout.addWidget(self.searchStatus)
+        self.cancelSearch = QtGui.QPushButton(self.searchProgressFrame)
+        self.cancelSearch.setObjectName("cancelSearch")
+        self.searchProgressLayout.addWidget(self.cancelSearch)
+        self.verticalLayout.addWidget(self.searchProgressFrame)
         self.verticalLayout_2.addLayout(self.verticalLayout)
         self.tabWidget.addTab(self.filesTab, "")
         self.toolsTab = QtGui.QWidget()
@@ -264,10 +280,6 @@ class Ui_MainWindow(object):
         self.existingTextureLabel.setText(QtGui.QApplication.translate("MainWindow", "<html><head/><body><p><span style=\" font-size:12pt;\">Scene Files</span></p></body></html>", None, QtGui.QApplication.UnicodeUTF8))
         self.colorKeyCurrent.setText(QtGui.QApplication.translate("MainWindow", "Currently in Project   ", None, QtGui.QApplication.UnicodeUTF8))
         self.colorKeyMissing.setText(QtGui.QApplication.translate("MainWindow", "   Missing Files   ", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(0).setText(QtGui.QApplication.translate("MainWindow", "Preview", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(1).setText(QtGui.QApplication.translate("MainWindow", "Node Type", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(2).setText(QtGui.QApplication.translate("MainWindow", "Default Folder", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(3).setText(QtGui.QApplication.translate("MainWindow", "Path", None, QtGui.QApplication.UnicodeUTF8))
         self.nodeTypesLabel.setText(QtGui.QApplication.translate("MainWindow", "File Types by Default Project Folder Settings", None, QtGui.QApplication.UnicodeUTF8))
         self.selectAllNodeTypes.setText(QtGui.QApplication.translate("MainWindow", "Select All Node Types", None, QtGui.QApplication.UnicodeUTF8))
         self.selectTextureNodesOnly.setText(QtGui.QApplication.translate("MainWindow", "Texture Files Only", None, QtGui.QApplication.UnicodeUTF8))
@@ -279,11 +291,19 @@ class Ui_MainWindow(object):
         self.updatePath.setToolTip(QtGui.QApplication.translate("MainWindow", "When this is checked, the nodes in the scene will be updated to the copied/moved path", None, QtGui.QApplication.UnicodeUTF8))
         self.updatePath.setStatusTip(QtGui.QApplication.translate("MainWindow", "Uncheck if you want to copy the file to source images, but want to keep the original file location on the node.", None, QtGui.QApplication.UnicodeUTF8))
         self.updatePath.setText(QtGui.QApplication.translate("MainWindow", "Update Path on Run", None, QtGui.QApplication.UnicodeUTF8))
+        self.deduplicate.setToolTip(QtGui.QApplication.translate("MainWindow", "When this is checked, files with the same contents are only copied once, and every node that used one of them is pointed at that single copy.", None, QtGui.QApplication.UnicodeUTF8))
+        self.deduplicate.setStatusTip(QtGui.QApplication.translate("MainWindow", "Check to copy identical files only once.", None, QtGui.QApplication.UnicodeUTF8))
+        self.deduplicate.setText(QtGui.QApplication.translate("MainWindow", "Deduplicate", None, QtGui.QApplication.UnicodeUTF8))
+        self.dryRun.setToolTip(QtGui.QApplication.translate("MainWindow", "When this is checked, the files that would be copied or moved, and the nodes that would be updated, are printed out, and nothing else happens.", None, QtGui.QApplication.UnicodeUTF8))
+        self.dryRun.setText(QtGui.QApplication.translate("MainWindow", "Dry Run", None, QtGui.QApplication.UnicodeUTF8))
         self.copy.setText(QtGui.QApplication.translate("MainWindow", "Copy Misplaced Files", None, QtGui.QApplication.UnicodeUTF8))
         self.move.setText(QtGui.QApplication.translate("MainWindow", "Move Misplaced Files", None, QtGui.QApplication.UnicodeUTF8))
+        self.link.setToolTip(QtGui.QApplication.translate("MainWindow", "Collects the files as reflinks or hardlinks when the project is on the same drive as the files, and copies them otherwise.  Hardlinked files share their contents with the originals.", None, QtGui.QApplication.UnicodeUTF8))
+        self.link.setText(QtGui.QApplication.translate("MainWindow", "Link Misplaced Files", None, QtGui.QApplication.UnicodeUTF8))
         self.search.setText(QtGui.QApplication.translate("MainWindow", "Attempt File Search", None, QtGui.QApplication.UnicodeUTF8))
         self.refresh.setText(QtGui.QApplication.translate("MainWindow", "Refresh Scene Files List", None, QtGui.QApplication.UnicodeUTF8))
         self.cancel.setText(QtGui.QApplication.translate("MainWindow", "Close", None, QtGui.QApplication.UnicodeUTF8))
+        self.cancelSearch.setText(QtGui.QApplication.translate("MainWindow", "Cancel Search", None, QtGui.QApplication.UnicodeUTF8))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.filesTab), QtGui.QApplication.translate("MainWindow", "Files", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.imageResizeReformat), QtGui.QApplication.translate("MainWindow", "Image Resize/Reformat", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.uvTilingSetup), QtGui.QApplication.translate("MainWindow", "UV Tiling Setup", None, QtGui.QApplication.UnicodeUTF8))
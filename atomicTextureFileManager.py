@@ -3,9 +3,19 @@ import os, platform, shutil
 from PySide import QtCore, QtGui
 from shiboken import wrapInstance
 import maya.OpenMayaUI as omui
+import maya.OpenMaya as om
 from xml.etree import ElementTree as ET
 from functools import partial
-import subprocess, glob, re
+from collections import OrderedDict
+import glob, re, fnmatch, difflib, time
+import threading, Queue
+import hashlib, json, sqlite3, stat
+try:
+    from scandir import scandir
+except ImportError:
+    scandir = getattr(os, 'scandir', None)
+from atomicTextureFileUtils import threadedMap, normalizePath, normalizeTextureName, tileKind, splitTileNames, \
+    fillTileGaps, sampledHash, fullHash, copyFile, verifyCopy, sameDevice, linkFile, planTransfers, makePlanDirectories
 
 __author__ = 'Adam Benson'
 __version__ = '1.0.6'
@@ -52,6 +62,9 @@ def atomicInterface():
 
 class atomicTextureFileManager(QtGui.QMainWindow):
     updateProgress = QtCore.Signal(int)
+    defaultSearchRoots = ['{sourceImages}', '{project}', '{siblings}']
+    defaultSearchExcludes = ['{images}', '{renderData}', '{diskCache}', '{fileCache}', '{autoSave}', '{movies}', '.*',
+                             'cache', 'caches', 'render', 'renders']
 
     def __init__(self, parent=None):
         super(atomicTextureFileManager, self).__init__(parent)
@@ -63,7 +76,31 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         self.checkBoxList = []
         self.tagTypes = re.compile(r'((_u|_U)\d*(_v|_V)\d*)|(<UDIM>)|(<UVTILE>)|(_(u|U)<U>_(v|V)<V>)')
         self.modes = {0: 'copy', 1: 'move', 2: 'missing'}
-        scriptsFolders = os.environ['MAYA_SCRIPT_PATH'].split(';')
+        self.projectResolver = atomicProjectResolver()
+        self.statWorkers = 16
+        self.crawlWorkers = 8
+        self.transferWorkers = 8
+        self.volumeWorkers = 4
+        # Reads a few blocks of every texture on each scan, so that missing files can be matched by content later.
+        # Turned on with <contentMatching>true</contentMatching> in atfm_SearchRoots.xml.
+        self.contentMatching = False
+        self.searchWorker = None
+        self.searchContext = {}
+        self.relinkTimer = QtCore.QTimer(self)
+        self.relinkTimer.setInterval(250)
+        self.relinkTimer.timeout.connect(self.applyRelinks)
+        self.textureSets = {}
+        thumbnailCache = atomicThumbnailCache(os.path.join(cmds.internalVar(userAppDir=True), 'atfm_thumbnails'))
+        self.thumbnailLoader = atomicThumbnailLoader(100, self, thumbnailCache)
+        self.textureModel = atomicTextureTableModel(self.thumbnailLoader, self)
+        self.thumbnailLoader.thumbnailReady.connect(self.textureModel.setThumbnail)
+        self.ui.existingTextureList.setModel(self.textureModel)
+        self.ui.existingTextureList.setItemDelegateForColumn(0, atomicThumbnailDelegate(self))
+        self.registeredTypes = None
+        self.unregisteredTypes = set()
+        self.inheritedTypes = {}
+        self.nodeTypeIndex = {}
+        scriptsFolders = os.environ['MAYA_SCRIPT_PATH'].split(os.pathsep)
         for folder in scriptsFolders:
             if os.path.exists(folder + '/atfm_TypeList.xml'):
                 self.typeListFile = folder + '/atfm_TypeList.xml'
@@ -71,6 +108,7 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         if self.typeListFile == '':
             self.typeListFile = self.buildDefaultXML()
         if self.typeListFile != '':
+            self.contentMatching = self.readSearchScope()[2]
             xml = ET.parse(self.typeListFile)
             root_element = xml.getroot()
             try:
@@ -91,6 +129,8 @@ class atomicTextureFileManager(QtGui.QMainWindow):
                 root_element.remove(child)
         xml.write(self.typeListFile)
         self.fileTypes.clear()
+        self.inheritedTypes = {}
+        self.nodeTypeIndex = {}
         for child in root_element:
             self.fileTypes[child.attrib['name']] = {'fileNameParam': child[0].text, 'defaultPath': child[1].text}
         self.setFileTypesList()
@@ -124,67 +164,108 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         # Close the window
         self.close()
 
+    def closeEvent(self, event):
+        if self.searchWorker:
+            self.searchWorker.cancel()
+            self.searchWorker.wait()
+        self.projectResolver.killJobs()
+        self.thumbnailLoader.stop()
+        super(atomicTextureFileManager, self).closeEvent(event)
+
     def getAllFiles(self):
         # This method searches through all the nodes in the Maya scenes, looking for node types listed in the XML file.
         # If nodes are found, then node type and the name of each node or nodes is saved into a dictionary and returned.
+        # All the registered types are listed in a single cmds.ls call.  showType hands back the actual type of each
+        # node, so derived types (psdFileTex from file, for instance) get filed under the XML type they inherit from.
         allFileTypes = {}
-        for thisType in self.fileTypes:
-            try:
-                selectedType = cmds.ls(type=thisType)
-                if len(selectedType) != 0:
-                    allFileTypes[thisType] = selectedType
-            except (RuntimeError, TypeError, NameError, ValueError):
-                pass
+        self.nodeTypeIndex = {}
+        searchTypes = self.getRegisteredFileTypes()
+        if not searchTypes:
+            return allFileTypes
+        try:
+            found = cmds.ls(type=searchTypes, showType=True) or []
+        except (RuntimeError, TypeError, NameError, ValueError):
+            found = []
+        for i in range(0, len(found) - 1, 2):
+            thisType = self.getListedType(found[i + 1], searchTypes)
+            if thisType:
+                allFileTypes.setdefault(thisType, []).append(found[i])
+                self.nodeTypeIndex[found[i]] = thisType
         return allFileTypes
 
+    def getRegisteredFileTypes(self):
+        # The registered node types are only collected once.  Any XML type that isn't registered in this session,
+        # like a node from an unloaded plugin, is recorded in unregisteredTypes and left out of the scans.
+        if self.registeredTypes is None:
+            self.registeredTypes = set(cmds.allNodeTypes() or [])
+        searchTypes = []
+        self.unregisteredTypes = set()
+        for thisType in self.fileTypes:
+            if thisType in self.registeredTypes:
+                searchTypes.append(thisType)
+            else:
+                self.unregisteredTypes.add(thisType)
+        return searchTypes
+
+    def getListedType(self, nodeType, searchTypes):
+        if nodeType in searchTypes:
+            return nodeType
+        if nodeType not in self.inheritedTypes:
+            listedType = ''
+            inherited = cmds.nodeType(nodeType, inherited=True, isTypeName=True) or []
+            for parentType in reversed(inherited):
+                if parentType in self.fileTypes:
+                    listedType = parentType
+                    break
+            self.inheritedTypes[nodeType] = listedType
+        return self.inheritedTypes[nodeType]
+
     def getPathNames(self, allFileTypes):
+        # Every node of a type shares the same file name attribute, so the whole type goes into one selection list
+        # and is read through the API.  Each node's plug is still found and read on its own; what this saves is the
+        # cmds.getAttr command, and its string parsing, for every single node.
         allPaths = {}
         for type in allFileTypes:
             shortList = allFileTypes[type]
-            for thisNode in shortList:
-                pathName = cmds.getAttr('%s.%s' % (thisNode, self.fileTypes[type]['fileNameParam']))
-                allPaths[thisNode] = pathName
+            allPaths.update(self.bulkGetAttr(shortList, self.fileTypes[type]['fileNameParam']))
         return allPaths
 
+    def bulkGetAttr(self, nodes, attr):
+        # Adds all the nodes to a single MSelectionList and reads the attribute straight off the dependency nodes.
+        # Anything the API can't handle (non-unique names, non-string attributes) falls back to a regular getAttr.
+        values = {}
+        selection = om.MSelectionList()
+        added = []
+        fallback = []
+        for node in nodes:
+            try:
+                selection.add(node)
+                added.append(node)
+            except RuntimeError:
+                fallback.append(node)
+        if selection.length() != len(added):
+            # Something got merged in the selection list, so the indexes no longer line up with the node names.
+            fallback.extend(added)
+            added = []
+        mObject = om.MObject()
+        for i in range(0, len(added)):
+            try:
+                selection.getDependNode(i, mObject)
+                plug = om.MFnDependencyNode(mObject).findPlug(attr, False)
+                values[added[i]] = plug.asString()
+            except RuntimeError:
+                fallback.append(added[i])
+        for node in fallback:
+            try:
+                values[node] = cmds.getAttr('%s.%s' % (node, attr))
+            except (RuntimeError, ValueError):
+                pass
+        return values
+
     def getSceneInfo(self):
-        sceneInfo = {}
-        sceneInfo['project'] = cmds.workspace(q=True, act=True)
-        sceneInfo['sourceImages'] = cmds.workspace(fre='sourceImages')
-        sceneInfo['scripts'] = cmds.workspace(fre='scripts')
-        sceneInfo['templates'] = cmds.workspace(fre='templates')
-        sceneInfo['images'] = cmds.workspace(fre='images')
-        sceneInfo['renderData'] = cmds.workspace(fre='renderData')
-        sceneInfo['clips'] = cmds.workspace(fre='clips')
-        sceneInfo['sound'] = cmds.workspace(fre='sound')
-        sceneInfo['diskCache'] = cmds.workspace(fre='diskCache')
-        sceneInfo['movies'] = cmds.workspace(fre='movies')
-        sceneInfo['translatorData'] = cmds.workspace(fre='translatorData')
-        sceneInfo['autoSave'] = cmds.workspace(fre='autoSave')
-        sceneInfo['alembicCache'] = cmds.workspace(fre='alembicCache')
-        # subcatagories
-        sceneInfo['offlineEdits'] = cmds.workspace(fre='offlineEdits')
-        sceneInfo['3dPaintTextures'] = cmds.workspace(fre='3dPaintTextures')
-        sceneInfo['depth'] = cmds.workspace(fre='depth')
-        sceneInfo['iprImages'] = cmds.workspace(fre='iprImages')
-        sceneInfo['shaders'] = cmds.workspace(fre='shaders')
-        sceneInfo['furFiles'] = cmds.workspace(fre='furFiles')
-        sceneInfo['furImages'] = cmds.workspace(fre='furImages')
-        sceneInfo['furEqualMap'] = cmds.workspace(fre='furEqualMap')
-        sceneInfo['furAttrMap'] = cmds.workspace(fre='furAttrMap')
-        sceneInfo['furShadowMap'] = cmds.workspace(fre='furShadowMap')
-        sceneInfo['particleCache'] = cmds.workspace(fre='particleCache')
-        sceneInfo['fileCache'] = cmds.workspace(fre='fileCache')
-        sceneInfo['bifrostCache'] = cmds.workspace(fre='bifrostCache')
-        sceneInfo['mayaAscii'] = cmds.workspace(fre='mayaAscii')
-        sceneInfo['mayaBinary'] = cmds.workspace(fre='mayaBinary')
-        sceneInfo['mel'] = cmds.workspace(fre='mel')
-        sceneInfo['OBJ'] = cmds.workspace(fre='OBJ')
-        sceneInfo['audio'] = cmds.workspace(fre='audio')
-        sceneInfo['move'] = cmds.workspace(fre='move')
-        sceneInfo['EPS'] = cmds.workspace(fre='EPS')
-        sceneInfo['adobeIllustrator'] = cmds.workspace(fre='adobeIllustrator')
-        sceneInfo['FBX'] = cmds.workspace(fre='FBX')
-        return sceneInfo
+        # All of the workspace lookups go through the project resolver, which only talks to Maya when the workspace
+        # has changed since the last call.
+        return self.projectResolver.getSceneInfo()
 
     def getSystemInfo(self):
         systemInfo = {}
@@ -194,27 +275,64 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         systemInfo['OS-Version'] = platform.version()
 
     def checkFileExistence(self, filePaths):
+        # Every node gets an atomicTextureSet holding all of its tiles.  A node only counts as existing when every tile
+        # is on disk, so a single missing tile in a UDIM set still shows up in missingFiles.  Both dictionaries hold
+        # the path from the node itself; the tiles and their stats live on in self.textureSets.
         existingFiles = {}
         missingFiles = {}
+        textureSets = {}
+        tilePaths = {}
+        dirIndex = atomicDirectoryIndex(self.tagTypes)
         for thisFile, path in filePaths.items():
             if path:
-                tagFound = self.lookForTags(path)
-                if tagFound:
-                    pathList = self.getImageCollection(path, tagFound)
-                    if not pathList:
-                        pathList = [path]
-                else:
-                    pathList = [path]
+                textureSets[thisFile] = atomicTextureSet(thisFile, path, self.lookForTags(path))
+                tilePaths[thisFile] = self.getTilePaths(path, textureSets[thisFile].tag, dirIndex)
+        # Several nodes often share the same texture, so each unique path is only checked once, and the checks are
+        # run in parallel since every stat on a network share costs a round trip.
+        uniquePaths = set()
+        for pathList in tilePaths.values():
+            uniquePaths.update(pathList)
+        pathStats = threadedMap(os.stat, uniquePaths, self.statWorkers)
+        for thisFile, textureSet in textureSets.items():
+            for thisPath in tilePaths[thisFile]:
+                textureSet.addTile(thisPath, pathStats.get(thisPath))
+            if textureSet.exists():
+                existingFiles[thisFile] = textureSet.pattern
+            else:
+                missingFiles[thisFile] = textureSet.pattern
+                if textureSet.isPartial():
+                    print '%s is missing %i of %i tiles' % (thisFile, len(textureSet.missingTiles()),
+                                                            len(textureSet.tiles))
+            if textureSet.tag:
+                # How many tiles a set should have isn't recorded anywhere, so a gap is only worth a warning.
+                listed = tilePaths[thisFile]
+                gaps = [gap for gap in fillTileGaps(textureSet.pattern, textureSet.tag, listed) if gap not in listed]
+                if gaps:
+                    print '%s might be missing %i tiles, like %s' % (thisFile, len(gaps), gaps[0].rsplit('/', 1)[-1])
+        self.textureSets = textureSets
+        if self.contentMatching:
+            self.recordTextureHashes(textureSets)
+        return existingFiles, missingFiles
 
+    def getTilePaths(self, path, tag, dirIndex=None):
+        pathList = []
+        if tag:
+            pathList = self.getImageCollection(path, tag, dirIndex)
+        if not pathList:
+            pathList = [path]
+        return pathList
+
+    def getTextureSet(self, node, path):
+        # Hands back the texture set from the last scan, or builds a fresh one if the node has changed since then.
+        textureSet = self.textureSets.get(node)
+        if textureSet is None or textureSet.pattern != path:
+            textureSet = atomicTextureSet(node, path, self.lookForTags(path))
+            for thisPath in self.getTilePaths(path, textureSet.tag):
                 try:
-                    for thisPath in pathList:
-                        if os.path.exists(thisPath):
-                            existingFiles[thisFile] = thisPath
-                        else:
-                            missingFiles[thisFile] = thisPath
-                except (RuntimeError, TypeError, NameError, ValueError):
-                    pass
-        return existingFiles, missingFiles
+                    textureSet.addTile(thisPath, os.stat(thisPath))
+                except OSError:
+                    textureSet.addTile(thisPath, None)
+        return textureSet
 
     def getSourceImagesFiles(self, files):
         sceneInfo = self.getSceneInfo()
@@ -308,71 +426,59 @@ class atomicTextureFileManager(QtGui.QMainWindow):
             # first one should be a check box
             table.setItem(rowCount, (col + 1), QtGui.QTableWidgetItem(param))
 
+    def getNodeType(self, node):
+        # Returns the XML type a node was listed under during the last scan.  Nodes created since then are looked up
+        # once and added to the index.
+        if node not in self.nodeTypeIndex:
+            self.nodeTypeIndex[node] = self.getListedType(cmds.nodeType(node), self.fileTypes)
+        return self.nodeTypeIndex[node]
+
     def getDefaultPath(self, nodeType):
-        thisNode = cmds.nodeType(nodeType)
-        for key, value in self.fileTypes.items():
-                if thisNode == key:
-                    defaultPath = value['defaultPath']
-                    break
-        return defaultPath
+        thisNode = self.getNodeType(nodeType)
+        if thisNode in self.fileTypes:
+            return self.fileTypes[thisNode]['defaultPath']
+        return ''
+
+    def classifyFiles(self, allFiles, inSourceFiles, missingFiles):
+        # Works out the status of every node in one pass with set lookups.  Missing wins over inSource, the same way
+        # the colors used to be layered.
+        inSourcePaths = set(inSourceFiles.values())
+        missingPaths = set(missingFiles.values())
+        statuses = {}
+        for node, path in allFiles.items():
+            if node in missingFiles or path in missingPaths:
+                statuses[node] = 'missing'
+            elif node in inSourceFiles or path in inSourcePaths:
+                statuses[node] = 'inSource'
+            else:
+                statuses[node] = ''
+        return statuses
 
     def populateTable(self, table, existingFiles, inSourceFiles, missingFiles, *args):
+        # The table is a view over atomicTextureTableModel.  This only builds the compact row tuples; the thumbnails
+        # and colors get painted by the view for the rows that are actually on screen.
         allFiles = existingFiles.copy()
         allFiles.update(missingFiles)
-        options = []
+        options = set()
         optionNames = self.optionsList()
         for thisOption in optionNames:
-            options.append(self.fileTypes[thisOption]['defaultPath'])
+            options.add(self.fileTypes[thisOption]['defaultPath'])
+        statuses = self.classifyFiles(allFiles, inSourceFiles, missingFiles)
+        rows = []
         for nodeType, path in allFiles.items():
             checkNode = self.getDefaultPath(nodeType)
             if checkNode in options:
-                rowCount = table.rowCount()
-                table.insertRow(rowCount)
-                if os.path.exists(path):
-                    thisImage = QtGui.QPixmap(path)
-                else:
-                    thisImage = QtGui.QPixmap()
-                thisImage.scaled(5, 5, QtCore.Qt.KeepAspectRatioByExpanding)
-                imageLabel = QtGui.QLabel()
-                imageLabel.setScaledContents(True)
-                imageLabel.setFixedHeight(100)
-                imageLabel.setFixedWidth(100)
-                imageLabel.setPixmap(thisImage)
-                imageLabel.setToolTip(path)
-                col = 0
-                defaultType = self.getDefaultPath(nodeType)
-                header = table.horizontalHeader()
-                header.setResizeMode(QtGui.QHeaderView.ResizeToContents)
-                header.setStretchLastSection(True)
-                table.setCellWidget(rowCount, col, imageLabel)
-                table.setItem(rowCount, (col + 1), QtGui.QTableWidgetItem(nodeType))
-                table.setItem(rowCount, (col + 2), QtGui.QTableWidgetItem(defaultType))
-                table.setItem(rowCount, (col + 3), QtGui.QTableWidgetItem(path))
-                # Check to see if the file matches the 'sourceimages' folder.  This is a two way process.
-                # If sourceimages is being iterated, then existingImages or missingImages will be compared.
-                inSourceColor = False
-                missingColor = False
-                for inNodeType, inPath in inSourceFiles.items():
-                    if inPath in path:
-                        thisColor = QtGui.QColor(0, 100, 0)
-                        inSourceColor = True
-                        break
-                    else:
-                        inSourceColor = False
-                for inNodeType, inPath in missingFiles.items():
-                    if inPath in path:
-                        thisColor = QtGui.QColor(100, 0, 0)
-                        missingColor = True
-                        break
-                    else:
-                        missingColor = False
-                if inSourceColor or missingColor:
-                    thisList = table.item(rowCount, col + 1)
-                    thisList.setBackground(thisColor)
-                    thisList = table.item(rowCount, col + 2)
-                    thisList.setBackground(thisColor)
-                    thisList = table.item(rowCount, (col + 3))
-                    thisList.setBackground(thisColor)
+                previewPath = ''
+                previewSize = 0
+                previewDate = 0
+                textureSet = self.textureSets.get(nodeType)
+                if textureSet and textureSet.existingTiles():
+                    previewTile = textureSet.existingTiles()[0]
+                    previewPath = previewTile['path']
+                    previewSize = previewTile['size']
+                    previewDate = previewTile['mtime']
+                rows.append((nodeType, checkNode, path, previewPath, previewSize, previewDate, statuses[nodeType]))
+        table.model().setRows(rows)
 
     def preloadSystem(self):
         # get scene data
@@ -393,7 +499,9 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         inSourceImagesFiles = getSourceImages[0]
         sourceImagesFolder = getSourceImages[1]
 
-        self.ui.existingTextureList.verticalHeader().setDefaultSectionSize(100);
+        self.ui.existingTextureList.verticalHeader().setDefaultSectionSize(100)
+        self.ui.existingTextureList.verticalHeader().setResizeMode(QtGui.QHeaderView.Fixed)
+        self.ui.existingTextureList.horizontalHeader().resizeSection(0, 100)
 
         self.ui.colorKeyCurrent.setAutoFillBackground(True)
         self.ui.colorKeyMissing.setAutoFillBackground(True)
@@ -418,6 +526,7 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         # setCurrentIndex() call in the if statement below.
         dropDown = self.foldersDropDown()[0]
         selectIndex = self.foldersDropDown()[1]
+        sourceImages = self.getSceneInfo()['sourceImages']
         for subFolder in dropDown:
             self.ui.defaultFolder.addItem(subFolder)
             # self.ui.defaultFolderTypes.addItem(subFolder)  # This isn't working because the list changed to table
@@ -425,7 +534,6 @@ class atomicTextureFileManager(QtGui.QMainWindow):
             # This is a patch for what was in the if statement: if '/sourceimages' in subFolder:
             # That won't work in the future, so I'm starting to patch it in now. The dynamic call to getSceneInfo is
             # the patch.
-            sourceImages = self.getSceneInfo()['sourceImages']
             if sourceImages in subFolder:
                 self.ui.defaultFolder.setCurrentIndex(selectIndex)
                 # self.ui.defaultFolderTypes.setCurrentRow(selectIndex)
@@ -435,6 +543,8 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         self.ui.cancel.clicked.connect(self.cancel)
         # self.ui.sourceText.setText(sourceImagesFolder)
         self.ui.refresh.clicked.connect(self.resetFileTrees)
+        self.ui.cancelSearch.clicked.connect(self.cancelSearch)
+        self.ui.searchProgressFrame.hide()
         # self.ui.browseSourceBtn.clicked.connect(self.setSourceImagesFolder)
         # self.ui.browseOriginBtn.clicked.connect(self.setOriginFolder)
         self.ui.newNodeType.setPlaceholderText('Node Type')
@@ -465,7 +575,7 @@ class atomicTextureFileManager(QtGui.QMainWindow):
                 mode = self.modes[i]
                 break'''
         sourceFolder = self.sourceFoldersList()
-        if mode == 'copy' or mode == 'move':
+        if mode == 'copy' or mode == 'move' or mode == 'link':
             try:
                 self.copyFiles(fileList, inSourceImages, sourceFolder, keepOriginalSubfolders, updatePath, mode)
             except (RuntimeError):
@@ -478,8 +588,8 @@ class atomicTextureFileManager(QtGui.QMainWindow):
                 print 'ValueError occurred. Cannot copy this specific file or folder.'
         elif mode == 'search':
             if len(missingFiles) != 0:
+                # The search runs in the background and refreshes the file trees itself once it's done.
                 self.findFilesOnComputer(missingFiles, inSourceImages, sourceFolder, keepOriginalSubfolders, updatePath, mode)
-                self.resetFileTrees()
             else:
                 cmds.confirmDialog(m='No Missing Files!')
         else:
@@ -500,6 +610,10 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         root_element.append(newNode)
         xml.write(self.typeListFile)
         self.fileTypes[nodeType] = {'fileNameParam': parameterName, 'defaultPath': defaultFolderName}
+        # The new type may come from a plugin that was loaded after the tool opened.
+        self.registeredTypes = None
+        self.inheritedTypes = {}
+        self.nodeTypeIndex = {}
         self.setFileTypesList()
 
     def setFileTypesList(self):
@@ -522,60 +636,106 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         self.ui.addNodeType.clicked.connect(partial(self.addNodeType))
 
     def findFilesOnComputer(self, fileList, inSourceImages, sourceFolder, keepOriginalSubfolders, updatePath, mode, *args):
+        # The search itself runs on an atomicSearchWorker thread.  Matches are queued up as they arrive and set on the
+        # nodes in batches by applyRelinks, and finishSearch takes care of the rest once the worker is done.
+        if self.searchWorker and self.searchWorker.isRunning():
+            cmds.confirmDialog(m='A file search is already running.')
+            return
         really = cmds.confirmDialog(m='A File search can take a very long time!  Are you sure you want to do this?', b=['Yes!', 'Nevermind'], db='Nevermind', cb='Nevermind')
-        if really == 'Yes!':
-            foundFiles = {}
-            driveStr = subprocess.check_output("fsutil fsinfo drives")
-            driveStr = driveStr.strip().lstrip('Drives: ')
-            drives = driveStr.split()
-            fileFound = False
-            selectedFiles = self.getSelectedItems(fileList)
-            for nodeType, path in selectedFiles.items():
-                thisNodeType = cmds.nodeType(nodeType)
-                fileParam = self.fileTypes[thisNodeType]['fileNameParam']
-                fileFound = False
-                try:
-                    slashPath = path.replace('\\', '/')
-                except (RuntimeError, TypeError, NameError, ValueError):
-                    slashPath = path
-                fileName = slashPath.rsplit('/', 1)[1]
-
-                tagFound = self.lookForTags(fileName)
-
-                print 'Searching for %s..............................' % fileName
-                for drive in drives:
-                    print 'searching on drive', drive
-                    for root, dirs, files in os.walk(drive):
-                        if tagFound:
-                            for thisFile in files:
-                                compoundFileName = self.tagTypes.search(thisFile)
-                                if compoundFileName:
-                                    compoundTag = compoundFileName.group()
-                                    splitCompound = thisFile.split(compoundTag)
-                                    compoundBaseName = splitCompound[0]
-                                    compoundExt = splitCompound[1]
-                                    splitFileName = fileName.split(tagFound)
-                                    fileNameBase = splitFileName[0]
-                                    fileNameExt = splitFileName[1]
-                                    if compoundBaseName == fileNameBase and compoundExt == fileNameExt:
-                                        newPath = os.path.join(root, fileName)
-                                        path = newPath.replace('\\', '/')
-                                        cmds.setAttr('%s.%s' % (nodeType, fileParam), path, type='string')
-                                        fileFound = True
-                                        foundFiles[nodeType] = path
-                                        break
-                        else:
-                            if fileName in files:
-                                newPath = os.path.join(root, fileName)
-                                path = newPath.replace('\\', '/')
-                                cmds.setAttr('%s.%s' % (nodeType, fileParam), path, type='string')
-                                fileFound = True
-                                foundFiles[nodeType] = path
-                                break
-                    if fileFound:
-                        print '%s Found!!' % path
-                        print '%s file path updated!' % nodeType
-                        break
+        if really != 'Yes!':
+            self.resetFileTrees()
+            return
+        searchRoots, searchExcludes = self.getSearchScope()
+        selectedFiles = self.getSelectedItems(fileList)
+        searchFiles = {}
+        for nodeType, path in selectedFiles.items():
+            try:
+                slashPath = path.replace('\\', '/')
+            except (RuntimeError, TypeError, NameError, ValueError):
+                slashPath = path
+            fileName = slashPath.rsplit('/', 1)[-1]
+            searchFiles[nodeType] = (fileName, self.lookForTags(fileName))
+            print 'Searching for %s..............................' % fileName
+        hashCachePath = None
+        if self.contentMatching:
+            hashCachePath = self.getHashCachePath()
+        self.searchContext = {'foundFiles': {}, 'pendingRelinks': [], 'candidates': {},
+                              'copyArgs': (inSourceImages, sourceFolder, keepOriginalSubfolders, updatePath) + args}
+        self.searchWorker = atomicSearchWorker(searchFiles, selectedFiles, searchRoots, searchExcludes,
+                                               self.getFileIndexPath(), hashCachePath, self.tagTypes,
+                                               self.crawlWorkers, self)
+        self.searchWorker.progress.connect(self.updateSearchProgress)
+        self.searchWorker.found.connect(self.queueRelink)
+        self.searchWorker.candidatesFound.connect(self.setSearchCandidates)
+        self.searchWorker.finished.connect(self.finishSearch)
+        self.ui.searchProgress.setRange(0, 0)
+        self.ui.searchStatus.setText('Searching...')
+        self.ui.searchProgressFrame.show()
+        self.relinkTimer.start()
+        self.searchWorker.start()
+
+    def cancelSearch(self):
+        if self.searchWorker:
+            self.ui.searchStatus.setText('Cancelling...')
+            self.searchWorker.cancel()
+
+    def updateSearchProgress(self, dirsScanned, filesMatched, expected, eta):
+        if expected > dirsScanned:
+            self.ui.searchProgress.setRange(0, expected)
+            self.ui.searchProgress.setValue(dirsScanned)
+        else:
+            self.ui.searchProgress.setRange(0, 0)
+        status = '%i folders scanned, %i files found' % (dirsScanned, filesMatched)
+        if eta >= 0:
+            status += ', about %i:%02i left' % (eta / 60, eta % 60)
+        self.ui.searchStatus.setText(status)
+
+    def queueRelink(self, nodeType, path):
+        self.searchContext['pendingRelinks'].append((nodeType, path))
+
+    def setSearchCandidates(self, candidates):
+        self.searchContext['candidates'] = candidates
+
+    def applyRelinks(self):
+        # Sets all the paths that came in since the last batch, as a single undo chunk.
+        pendingRelinks = self.searchContext['pendingRelinks']
+        if not pendingRelinks:
+            return
+        self.searchContext['pendingRelinks'] = []
+        cmds.undoInfo(openChunk=True)
+        try:
+            for nodeType, path in pendingRelinks:
+                self.relinkFoundFile(nodeType, path)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    def finishSearch(self):
+        self.relinkTimer.stop()
+        self.applyRelinks()
+        self.ui.searchProgressFrame.hide()
+        cancelled = self.searchWorker.cancelled
+        self.searchWorker = None
+        foundFiles = self.searchContext['foundFiles']
+        if cancelled:
+            print 'Search cancelled ----------------------------------------------------------------------------------'
+        else:
+            # Anything that couldn't be found by name was ranked against similar files in the index.  The closest
+            # matches are printed, and the best one for each node is only linked if the user agrees.
+            bestMatches = {}
+            for nodeType, candidates in self.searchContext['candidates'].items():
+                print 'Closest matches for %s:' % nodeType
+                for score, candidate in candidates[:5]:
+                    print '    %.2f  %s' % (score, candidate)
+                if candidates[0][0] >= atomicCandidateMatcher.threshold:
+                    bestMatches[nodeType] = candidates[0][1]
+            if bestMatches:
+                relink = cmds.confirmDialog(m='%i missing files could not be found by name, but have close matches.  '
+                                              'The candidates are listed in the Script Editor.  Would you like to '
+                                              'relink them to the best matches?' % len(bestMatches),
+                                            b=['Relink', 'Skip'], db='Relink', cb='Skip')
+                if relink == 'Relink':
+                    self.searchContext['pendingRelinks'] = bestMatches.items()
+                    self.applyRelinks()
             print 'Search finished ------------------------------------------------------------------------------------'
         self.resetFileTrees()
         print 'File Tree Reset'
@@ -589,7 +749,177 @@ class atomicTextureFileManager(QtGui.QMainWindow):
                     mode = 'copy'
                 else:
                     mode = 'move'
-                self.copyFiles(foundFiles, inSourceImages, sourceFolder, keepOriginalSubfolders, updatePath, mode, *args)
+                copyArgs = self.searchContext['copyArgs']
+                self.copyFiles(foundFiles, copyArgs[0], copyArgs[1], copyArgs[2], copyArgs[3], mode, *copyArgs[4:])
+
+    def getSearchScope(self):
+        # The search roots and exclusion patterns live in atfm_SearchRoots.xml, next to the type list.  Roots are
+        # searched in the order they are listed, so the nearest folders should go first.  Both lists can use
+        # {project}, {sourceImages} or any other file rule name, and {siblings} expands to the other Maya projects
+        # that sit next to this one.  Excludes are glob patterns, matched against a folder's name and its full path.
+        roots, excludes, self.contentMatching = self.readSearchScope()
+        searchRoots = []
+        for searchRoot in self.expandSearchPaths(roots):
+            if os.path.isdir(searchRoot) and searchRoot not in searchRoots:
+                searchRoots.append(searchRoot)
+        return searchRoots, self.expandSearchPaths(excludes)
+
+    def readSearchScope(self):
+        # Returns the unexpanded (roots, excludes, contentMatching) from atfm_SearchRoots.xml, writing the defaults
+        # out first if there's no file yet.
+        scopeFile = os.path.join(os.path.dirname(self.typeListFile), 'atfm_SearchRoots.xml')
+        if not os.path.exists(scopeFile):
+            self.buildDefaultSearchScope(scopeFile)
+        roots = []
+        excludes = []
+        contentMatching = False
+        try:
+            root_element = ET.parse(scopeFile).getroot()
+            for child in root_element:
+                if child.text and child.text.strip():
+                    if child.tag == 'root':
+                        roots.append(child.text.strip())
+                    elif child.tag == 'exclude':
+                        excludes.append(child.text.strip())
+                    elif child.tag == 'contentMatching':
+                        contentMatching = child.text.strip().lower() in ('true', 'yes', '1')
+        except (IOError, ET.ParseError):
+            print 'Unable to read %s.  Using the default search roots.' % scopeFile
+            roots = list(self.defaultSearchRoots)
+            excludes = list(self.defaultSearchExcludes)
+        return roots, excludes, contentMatching
+
+    def buildDefaultSearchScope(self, scopeFile):
+        xmlString = '<atfm_SearchRoots>'
+        for searchRoot in self.defaultSearchRoots:
+            xmlString += '<root>%s</root>' % searchRoot
+        for exclude in self.defaultSearchExcludes:
+            xmlString += '<exclude>%s</exclude>' % exclude
+        xmlString += '<contentMatching>false</contentMatching>'
+        xmlString += '</atfm_SearchRoots>'
+        try:
+            newXML = open(scopeFile, 'w')
+            newXML.write(xmlString)
+            newXML.close()
+        except IOError:
+            print 'Unable to write the default search roots to %s' % scopeFile
+
+    def expandSearchPaths(self, paths):
+        sceneInfo = self.getSceneInfo()
+        project = sceneInfo['project'].rstrip('/\\')
+        tokens = {}
+        for rule, folder in sceneInfo.items():
+            if folder and rule != 'project':
+                tokens['{%s}' % rule] = os.path.join(project, folder)
+        tokens['{project}'] = project
+        expanded = []
+        for path in paths:
+            if path == '{siblings}':
+                expanded.extend(self.getSiblingProjects(project))
+                continue
+            for token, folder in tokens.items():
+                path = path.replace(token, folder)
+            if '{' not in path:
+                expanded.append(os.path.normpath(path))
+        return expanded
+
+    def getSiblingProjects(self, project):
+        siblings = []
+        parent = os.path.dirname(project)
+        try:
+            folders = sorted(os.listdir(parent))
+        except OSError:
+            folders = []
+        for folder in folders:
+            checkPath = os.path.join(parent, folder)
+            if checkPath != project and os.path.isfile(os.path.join(checkPath, 'workspace.mel')):
+                siblings.append(checkPath)
+        return siblings
+
+    def getFileIndexPath(self):
+        return os.path.join(cmds.internalVar(userAppDir=True), 'atfm_FileIndex.db')
+
+    def getHashCachePath(self):
+        return os.path.join(cmds.internalVar(userAppDir=True), 'atfm_Hashes.db')
+
+    def recordTextureHashes(self, textureSets):
+        # Remembers what every existing texture looks like, so if it goes missing later, a renamed copy of it can be
+        # found by content.  Only files that changed since the last scan are read.
+        hashCache = atomicHashCache(self.getHashCachePath())
+        toHash = []
+        for textureSet in textureSets.values():
+            if not textureSet.tag:
+                for tile in textureSet.existingTiles():
+                    if hashCache.get(tile['path'], tile['size'], tile['mtime']) is None:
+                        toHash.append((tile['path'], tile['size'], tile['mtime']))
+        hashes = threadedMap(lambda tile: sampledHash(tile[0]), toHash, self.statWorkers)
+        for tile, sampled in hashes.items():
+            if sampled:
+                hashCache.put(tile[0], tile[1], tile[2], sampled)
+        hashCache.close()
+
+    def hashFiles(self, hashCache, files, full=False):
+        # Hashes {path: stat} on the thread pool and returns {path: hash}, skipping the files whose hash is already
+        # cached for their current size and mtime.  Sampled hashes by default, full hashes if asked.
+        hashes = {}
+        toHash = []
+        for path, fileStat in files.items():
+            if full:
+                known = hashCache.getFull(path, fileStat.st_size, fileStat.st_mtime)
+            else:
+                known = hashCache.get(path, fileStat.st_size, fileStat.st_mtime)
+            if known is None:
+                toHash.append(path)
+            else:
+                hashes[path] = known
+        if full:
+            hashed = threadedMap(fullHash, toHash, self.statWorkers)
+        else:
+            hashed = threadedMap(sampledHash, toHash, self.statWorkers)
+        for path, digest in hashed.items():
+            if digest:
+                fileStat = files[path]
+                if full:
+                    hashCache.putFull(path, fileStat.st_size, fileStat.st_mtime, digest)
+                else:
+                    hashCache.put(path, fileStat.st_size, fileStat.st_mtime, digest)
+                hashes[path] = digest
+        return hashes
+
+    def findIdenticalTransfers(self, transfers, stats):
+        # Checks which same size (src, dest) pairs really hold the same content, so a copy that didn't keep the mtime
+        # doesn't get copied all over again.  The sampled hashes rule out most pairs after reading a few blocks, and
+        # only the pairs that still match get hashed in full.
+        identical = set()
+        if not transfers:
+            return identical
+        hashCache = atomicHashCache(self.getHashCachePath())
+        try:
+            files = {}
+            for transfer in transfers:
+                files[transfer[2]] = stats[transfer[2]]
+                files[transfer[3]] = stats[transfer[3]]
+            sampled = self.hashFiles(hashCache, files)
+            candidates = [transfer for transfer in transfers
+                          if sampled.get(transfer[2]) and sampled.get(transfer[2]) == sampled.get(transfer[3])]
+            files = {}
+            for transfer in candidates:
+                files[transfer[2]] = stats[transfer[2]]
+                files[transfer[3]] = stats[transfer[3]]
+            full = self.hashFiles(hashCache, files, full=True)
+            for transfer in candidates:
+                if full.get(transfer[2]) and full.get(transfer[2]) == full.get(transfer[3]):
+                    identical.add(transfer)
+        finally:
+            hashCache.close()
+        return identical
+
+    def relinkFoundFile(self, nodeType, path):
+        fileParam = self.fileTypes[self.getNodeType(nodeType)]['fileNameParam']
+        cmds.setAttr('%s.%s' % (nodeType, fileParam), path, type='string')
+        self.searchContext['foundFiles'][nodeType] = path
+        print '%s Found!!' % path
+        print '%s file path updated!' % nodeType
 
     def setSourceImagesFolder(self):
         getSourceImagesFolder = cmds.fileDialog2(fm=3)
@@ -601,40 +931,32 @@ class atomicTextureFileManager(QtGui.QMainWindow):
 
     def getSelectedItems(self, fileList):
         print 'FileList:', fileList
-        getSelection = self.ui.existingTextureList.selectedItems()
-        # print 'getSelection:', getSelection[0]
+        getSelection = self.ui.existingTextureList.selectionModel().selectedRows()
         selectedFileList = {}
         if getSelection:
-            total = len(getSelection)
-            for selected in range(0, total, 3):
-                selectedNode = getSelection[selected].text()
-                print 'selectedNode:', selectedNode
-                selectedFileList[selectedNode] = getSelection[selected + 1].text()
+            for selected in getSelection:
+                row = self.textureModel.rows[selected.row()]
+                print 'selectedNode:', row[0]
+                selectedFileList[row[0]] = row[2]
         else:
             selectedFileList = fileList
         return selectedFileList
 
-    def getImageCollection(self, path, tag):
-        fileCollection = []
+    def getImageCollection(self, path, tag, dirIndex=None):
+        # dirIndex is shared across a whole scan, so a directory holding hundreds of UDIM sets only gets listed once.
+        if dirIndex is None:
+            dirIndex = atomicDirectoryIndex(self.tagTypes)
         splitPath = path.rsplit('/', 1)
+        if len(splitPath) < 2:
+            return []
         basePath = splitPath[0]
         fileName = splitPath[1]
-        splitFile = path.split(tag)
+        splitFile = fileName.split(tag)
+        if len(splitFile) < 2:
+            return []
         pre = splitFile[0]
         post = splitFile[1]
-        checkDirectory = os.path.isdir(basePath)
-        if checkDirectory:
-            dirList = os.listdir(basePath)
-            for dirObj in dirList:
-                checkPath = basePath + '/' + dirObj
-                if os.path.isfile(checkPath):
-                    if self.tagTypes.search(checkPath):
-                        foundFileTag = self.tagTypes.search(checkPath).group()
-                        matchBase = checkPath.split(foundFileTag)[0]
-                        matchExt = checkPath.split(foundFileTag)[1]
-                        if matchBase == pre and matchExt == post:
-                            fileCollection.append(checkPath)
-        return fileCollection
+        return dirIndex.getTiles(basePath, pre, post, tileKind(tag))
 
     def optionsList(self):
         # This cycles through the selection types option box, since the options are created dynamically.
@@ -645,170 +967,350 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         return options
 
     def copyFiles(self, fileList, inSourceImages, sourceFolder, keepOriginalSubfolders, updatePath, mode, *args):
-        # I think I need to change the parameters above to the **kwargs in order to take more limited suggestions
-        # Although, I know I'm still going to need some of this info, so it might be better to pass it to the
-        # findFilesOnComputer.
-
-        # Update:  I'm a little uncertain as to what my above note is about.
-
-        update = 0
+        # Plans the whole transfer first, then sorts out duplicates and conflicts, and only then touches the disk:
+        # the folders all get made at once, the files transfer in parallel and the scene gets updated in one go.
+        if not self.ui.dryRun.isChecked():
+            self.resumeTransfers()
         selectedFileList = self.getSelectedItems(fileList)
-        # I am temporarily disabling the Progress Bar until I get it working.  For version 1, I will use a print out of
-        # each file successfully copied.
+        sceneInfo = self.getSceneInfo()
+        # Only nodes whose default folder belongs to one of the checked node types get collected, and anything that's
+        # already in sourceImages is left where it is.
+        optionsList = [self.fileTypes[thisOption]['defaultPath'] for thisOption in self.optionsList()]
+        alreadyInSource = set(inSourceImages.values())
+        selection = {}
         for nodeType, path in selectedFileList.items():
-            update += 1
-            # Update progress bar here.
-            # print update
-            for folder in sourceFolder:
-                print 'for folder in sourceFolder:', folder
-                # If I'm not mistaken, then folder in sourceFolders should loop AND compare with the options list of
-                # selected folder types.  BUT where does that hook in below?
-                optionsList = []
-                optionNames = self.optionsList()
-                for thisOption in optionNames:
-                    optionsList.append(self.fileTypes[thisOption]['defaultPath'])
-                print optionsList
-                print folder
-                # This breaks BECAUSE we need to see if the object's default folder is in the options list,
-                # Currently, it's looking to see if the list of folder types available are in the checked options list
-                # Duh, of course they are.  So, I need to get the object default folder.
-                if folder in optionsList:
-                    if '/' in path:
-                        # ALERT!!! This split path is what is currently breaking the copy feature.
-                        # The problem:
-                        #   Because our default textures folder is /publish/textures, then the split path breaks those up and catalogs them inapprorpiately under the "Keep subfolders" loop.
-                        #   I think the solution will be to pre-split the path with the default folder: path.split('/publish/textures').
-                        #   Then I should be able to split the path to keep the rest of the hierarchy.
-                        # This may also cause issues down the line with the way other paths are searched, or it may actually improve some problems.
-                        splitPath = path.split('/')
-                        print 'forward slash split path found'
-                    elif '\\' in path:
-                        splitPath = path.split('\\')
-                        print 'back slash split path found'
-                    if path not in inSourceImages.values():
-                        print 'Path not in InSourceImages.values()', path
-                        print 'This is important, because if it\'s already in sourceImages, then there\'s no need to copy'
-                        # Need to add some other conditions and actions here.
-                        # ALERT!! This method will most likely fail alembic copies, or any other non-sourceimages files.
-                        # This is just for the subfolder search. I think I just need to replace 'sourceimages' with a
-                        # bona-fide variable from one of the folder type lists.
-                        # It needs to reflect both the getSceneInfo list, but also the catagories list
-                        sourceImages = self.getSceneInfo()['sourceImages']
-                        root = self.getSceneInfo()['project']
-                        print root
-                        sourceImagesPath = root + '/' + sourceImages
-                        print 'sourceImages folder:', sourceImagesPath
-                        if keepOriginalSubfolders:
-                            print 'Keep Original Folders is Checked'
-                            # the 'sourceImages' string needs to be replaced with a loop that searches through the fileTypes
-                            print 'SourceImages = %s | splitPath = %s' % (sourceImages, splitPath)
-                            if sourceImages in splitPath:
-                                print 'sourceImages in splitPath =', sourceImages, splitPath
-                                # I think source images needs to be the full path
-                                pathFrom = splitPath.index(sourceImages)
-                                print 'pathFrom', pathFrom
-                                pathLength = len(splitPath)
-                                print 'pathLength', pathLength
-                                newPath = sourceImagesPath
-                                for x in range((pathFrom + 1), (pathLength - 1)):
-                                    print 'pathFrom to pathLength x =', x
-                                    newPath = newPath + '/' + splitPath[x]
-                                    if not os.path.isdir(newPath):
-                                        print 'newPath not found, making directory', newPath
-                                        os.mkdir(newPath)
-                            else:
-                                newPath = sourceImagesPath
-                                print 'newPath is the same as sourceFolder', newPath
-                        else:
-                            newPath = sourceImagesPath
-                            print 'Keep Original Folders is NOT Checked and newPath =', newPath
-                        print 'Begin Tag Check'
-
-                        tagFound = self.lookForTags(newPath)
-                        print 'Tag check successful'
-
-                        if tagFound:
-                            print 'tag was found'
-                            pathList = self.getImageCollection(path, tagFound)
-                            print 'Copy path list =', pathList
-                        else:
-                            print 'No Tag found'
-                            pathList = [path]
-                            print 'Copy path list =', pathList
-
-                        for thisPath in pathList:
-                            fileName = thisPath.rsplit('/', 1)[1]
-                            checkPath = os.path.join(newPath, fileName)
-                            if os.path.isfile(checkPath):
-                                originalSize = os.path.getsize(thisPath)
-                                newSize = os.path.getsize(checkPath)
-                                originalDate = os.path.getmtime(thisPath)
-                                newDate = os.path.getmtime(checkPath)
-                                if newSize == originalSize and newDate == originalDate:
-                                    print 'The files are the same'
-                                    conflictResolution = cmds.confirmDialog(m='The file %s already exists and appears '
-                                                                              'to be the same in both locations.  How '
-                                                                              'would you like to proceed?' % fileName,
-                                                                            button=['Overwrite', 'Skip'],
-                                                                            db='Overwrite', cb='Skip')
-                                    if conflictResolution == 'Overwrite':
-                                        self.copyAction(mode, thisPath, os.path.join(newPath, fileName), path)
-                                    else:
-                                        pass
-                                elif newSize != originalSize or newDate != originalDate:
-                                    print 'The files are different'
-                                    conflictResolution = cmds.confirmDialog(m='There is already a file with the name %s'
-                                                                              ' in the source images folder. How would'
-                                                                              ' you like to proceed?' % fileName,
-                                                                            button=['Overwrite', 'Use Latest',
-                                                                                    'Use Largest', 'Skip'],
-                                                                            db='Overwrite', cb='Skip')
-                                    if conflictResolution == 'Overwrite':
-                                       self.copyAction(mode, thisPath, os.path.join(newPath, fileName), path)
-                                    elif conflictResolution == 'Use Latest':
-                                        if originalDate > newDate:
-                                            print 'Copy the Original File'
-                                            self.copyAction(mode, thisPath, os.path.join(newPath, fileName), path)
-                                        else:
-                                            print 'Use New Path instead'
-                                    elif conflictResolution == 'Use Largest':
-                                        if originalSize > newSize:
-                                            print 'Copy the Original File'
-                                            self.copyAction(mode, thisPath, os.path.join(newPath, fileName), path)
-                                        else:
-                                            print 'Use the New File'
-                                    else:
-                                        pass
-                            else:
-                                self.copyAction(mode, thisPath, os.path.join(newPath, fileName), path)
-
-                    # Progress Bar Call ---- SEE INITIAL CALL
-                    '''self.updateProgress.emit(update)
-                    time.sleep(0.1)'''
-
-                    updatedPath = newPath + '/' + splitPath[-1]
-                    thisNode = cmds.nodeType(nodeType)
-                    fileParam = self.fileTypes[thisNode]['fileNameParam']
-                    defaultPath = self.fileTypes[thisNode]['defaultPath']
-                    if updatePath:
-                        cmds.setAttr('%s.%s' % (nodeType, fileParam), updatedPath, type='string')
-                        print '%s Updated successfully!' % updatedPath
+            if self.getDefaultPath(nodeType) not in optionsList or path in alreadyInSource:
+                continue
+            # The tiles were all gathered during the scan, so there's no need to go looking for them.
+            textureSet = self.getTextureSet(nodeType, path)
+            tilePaths = [tile['path'] for tile in textureSet.existingTiles()]
+            if not tilePaths:
+                print '%s was not updated, because none of its files could be found.' % nodeType
+                continue
+            selection[nodeType] = (path, tilePaths)
+        plans = planTransfers(selection, sceneInfo['project'], sceneInfo['sourceImages'], keepOriginalSubfolders, mode)
+        planned = set([plan.node for plan in plans])
+        for nodeType in sorted(set(selection) - planned):
+            print '%s was left alone, because its files are already where they would go.' % nodeType
+        transfers = []
+        relinks = []
+        for plan in plans:
+            for src, dest in plan.tiles:
+                transfers.append((plan.node, plan.action, src, dest, plan.source))
+            if updatePath:
+                fileParam = self.fileTypes[self.getNodeType(plan.node)]['fileNameParam']
+                relinks.append((plan.node, fileParam, plan.source, plan.destination))
+        if self.ui.deduplicate.isChecked():
+            transfers, relinks, saved = self.deduplicateTransfers(transfers, relinks)
+            print 'Deduplicating saved %.1f MB.' % (saved / 1048576.0)
+        if self.ui.dryRun.isChecked():
+            self.printTransferPlan(transfers, relinks)
+            return
+        transfers = self.resolveConflicts(transfers)
+        if transfers is None:
+            print 'Transfer cancelled.'
+            return
+        makePlanDirectories(transfers)
+        journal = atomicTransferJournal(self.getTransferJournalPath())
+        journal.begin(transfers, relinks)
+        self.executeTransfers(transfers, relinks, journal)
         # Dialog.close()
         self.resetFileTrees()
 
-    def copyAction(self, mode, src, dest, path):
-        print '-------------------------------------------------------------'
-        print mode
-        print src
-        print dest
-        print path
-        print '-------------------------------------------------------------'
+    def printTransferPlan(self, transfers, relinks):
+        # The dry run.  Lists what would happen without touching the disk or the scene.
+        for nodeType, mode, src, dest, path in sorted(transfers):
+            print '%s: %s %s to %s' % (nodeType, mode, src, dest)
+        for nodeType, fileParam, oldPath, updatedPath in sorted(relinks):
+            print '%s.%s: %s -> %s' % (nodeType, fileParam, oldPath, updatedPath)
+        print 'Dry run: %i files would be transferred and %i nodes updated.' % (len(transfers), len(relinks))
+
+    def deduplicateTransfers(self, transfers, relinks):
+        # Finds sources that hold the same bytes under different paths, so each payload only gets copied once, and
+        # points the nodes that used a duplicate at the one copy that does get collected.  Only nodes with a single
+        # file are folded together; the tiles of a UDIM set have to stay side by side under one pattern.  A duplicate's
+        # transfer is swapped for a copy of the keeper's, so runTransfers hangs its node on the keeper's job, and if
+        # that job fails the node isn't relinked either.  Returns the new transfers and relinks, along with the number
+        # of bytes saved.
+        nodeTransfers = {}
+        for transfer in transfers:
+            nodeTransfers.setdefault(transfer[0], []).append(transfer)
+        singles = [group[0] for group in nodeTransfers.values() if len(group) == 1]
+        stats = threadedMap(os.stat, set([transfer[2] for transfer in singles]), self.statWorkers)
+        bySize = {}
+        for src, srcStat in stats.items():
+            if srcStat:
+                bySize.setdefault(srcStat.st_size, []).append(src)
+        files = {}
+        for group in bySize.values():
+            if len(group) > 1:
+                for src in group:
+                    files[src] = stats[src]
+        if not files:
+            return transfers, relinks, 0
+        hashCache = atomicHashCache(self.getHashCachePath())
+        try:
+            sampled = self.hashFiles(hashCache, files)
+            counts = {}
+            for digest in sampled.values():
+                counts[digest] = counts.get(digest, 0) + 1
+            files = dict([(src, files[src]) for src, digest in sampled.items() if counts[digest] > 1])
+            full = self.hashFiles(hashCache, files, full=True)
+        finally:
+            hashCache.close()
+        keepers = {}
+        for src in sorted(full):
+            keepers.setdefault(full[src], src)
+        keeperTransfers = {}
+        for transfer in singles:
+            if keepers.get(full.get(transfer[2])) == transfer[2]:
+                keeperTransfers.setdefault(transfer[2], transfer)
+        repoint = {}
+        replaced = {}
+        savedDests = set()
+        saved = 0
+        for transfer in singles:
+            keeper = keepers.get(full.get(transfer[2]))
+            if not keeper or keeper == transfer[2] or keeper not in keeperTransfers:
+                continue
+            keeperTransfer = keeperTransfers[keeper]
+            replaced[transfer] = (transfer[0],) + keeperTransfer[1:]
+            repoint[transfer[0]] = keeperTransfer[3].replace('\\', '/')
+            if keeperTransfer[3] != transfer[3] and transfer[3] not in savedDests:
+                savedDests.add(transfer[3])
+                saved += stats[transfer[2]].st_size
+        for transfer in sorted(replaced):
+            print '%s is the same as %s, so it will not be copied.' % (transfer[2], keepers[full[transfer[2]]])
+        transfers = [replaced.get(transfer, transfer) for transfer in transfers]
+        relinks = [(nodeType, fileParam, oldPath, repoint.get(nodeType, updatedPath))
+                   for nodeType, fileParam, oldPath, updatedPath in relinks]
+        return transfers, relinks, saved
+
+    def findConflicts(self, transfers):
+        # Stats every source and destination at once, and sorts the transfers whose destination already exists by how
+        # the two files differ.  Returns {kind: [transfer]} along with the stats, keyed by path.
+        paths = set()
+        for transfer in transfers:
+            paths.update(transfer[2:4])
+        stats = threadedMap(os.stat, paths, self.statWorkers)
+        conflicts = OrderedDict((kind, []) for kind in atomicConflictDialog.kinds)
+        sameSize = []
+        for transfer in transfers:
+            srcStat = stats.get(transfer[2])
+            destStat = stats.get(transfer[3])
+            if srcStat and destStat and destStat.st_size == srcStat.st_size and destStat.st_mtime != srcStat.st_mtime:
+                sameSize.append(transfer)
+        identical = self.findIdenticalTransfers(sameSize, stats)
+        for transfer in transfers:
+            srcStat = stats.get(transfer[2])
+            destStat = stats.get(transfer[3])
+            if not srcStat or not destStat:
+                continue
+            if transfer in identical or \
+                    (destStat.st_size == srcStat.st_size and destStat.st_mtime == srcStat.st_mtime):
+                kind = 'identical'
+            elif destStat.st_mtime > srcStat.st_mtime:
+                kind = 'newer'
+            elif destStat.st_size > srcStat.st_size:
+                kind = 'larger'
+            else:
+                kind = 'different'
+            conflicts[kind].append(transfer)
+        return conflicts, stats
+
+    def resolveConflicts(self, transfers):
+        # Asks once, in a single dialog, what to do with every destination that already exists, and returns the
+        # transfers that should still go ahead.  Returns None if the dialog was cancelled.
+        conflicts, stats = self.findConflicts(transfers)
+        if not any(conflicts.values()):
+            return transfers
+        dialog = atomicConflictDialog(conflicts, self)
+        if not dialog.exec_():
+            return None
+        policies = dialog.policies()
+        skipped = set()
+        for kind, group in conflicts.items():
+            policy = policies.get(kind)
+            for transfer in group:
+                srcStat = stats[transfer[2]]
+                destStat = stats[transfer[3]]
+                if policy == 'Skip' or \
+                        (policy == 'Use Latest' and srcStat.st_mtime <= destStat.st_mtime) or \
+                        (policy == 'Use Largest' and srcStat.st_size <= destStat.st_size):
+                    skipped.add(transfer)
+        if skipped:
+            print '%i files were skipped, and the existing copies will be used instead.' % len(skipped)
+        return [transfer for transfer in transfers if transfer not in skipped]
+
+    def executeTransfers(self, transfers, relinks, journal):
+        # Runs the transfers, points the nodes at their new files in one undo chunk, and only then removes the sources
+        # of cross device moves.  Every step goes into the journal, so a run that gets cut off can be picked up again.
+        failedNodes, movedSources = self.runTransfers(transfers, journal, set([relink[0] for relink in relinks]))
+        cmds.undoInfo(openChunk=True)
+        try:
+            for nodeType, fileParam, oldPath, updatedPath in relinks:
+                if nodeType in failedNodes:
+                    print '%s was not updated, because not all of its files were transferred.' % nodeType
+                    continue
+                cmds.setAttr('%s.%s' % (nodeType, fileParam), updatedPath, type='string')
+                journal.write('relinked', node=nodeType, attr=fileParam, old=oldPath, new=updatedPath)
+                print '%s Updated successfully!' % updatedPath
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        self.removeMovedSources(movedSources, failedNodes, journal)
+        journal.finish()
+
+    def getTransferJournalPath(self):
+        return os.path.join(self.getSceneInfo()['project'], 'atfm_TransferJournal.log')
+
+    def resumeTransfers(self):
+        # Checks whether the last copy/move into this project was cut off, by a crash for instance, and offers to
+        # finish it or to put the scene back the way it was.
+        journal = atomicTransferJournal(self.getTransferJournalPath())
+        plan = journal.unfinished()
+        if not plan:
+            return
+        transfers = [tuple(transfer) for transfer in plan['transfers']]
+        relinks = [tuple(relink) for relink in plan['relinks']]
+        answer = cmds.confirmDialog(m='The last copy/move into this project (%i files, %i nodes) did not finish.  How '
+                                      'would you like to proceed?' % (len(transfers), len(relinks)),
+                                    button=['Finish It', 'Roll Back', 'Ignore'], db='Finish It', cb='Ignore')
+        if answer == 'Finish It':
+            self.executeTransfers(transfers, relinks, journal)
+        elif answer == 'Roll Back':
+            self.rollBackTransfers(transfers, relinks, journal)
+        else:
+            journal.finish()
+
+    def rollBackTransfers(self, transfers, relinks, journal):
+        # Puts moved files back where they came from, then points the nodes back at their old paths.  Copies are left
+        # where they are, since the originals were never touched.
+        completed = journal.completed()
+        moved = set()
+        for nodeType, mode, src, dest, path in transfers:
+            if mode != 'move' or dest in moved or dest not in completed:
+                continue
+            moved.add(dest)
+            if os.path.isfile(dest) and not os.path.exists(src):
+                try:
+                    shutil.move(dest, src)
+                    journal.write('restored', src=src, dest=dest)
+                except (IOError, OSError, shutil.Error) as e:
+                    print 'Unable to move %s back to %s: %s' % (dest, src, e)
+        cmds.undoInfo(openChunk=True)
+        try:
+            for nodeType, fileParam, oldPath, updatedPath in relinks:
+                if cmds.objExists(nodeType):
+                    cmds.setAttr('%s.%s' % (nodeType, fileParam), oldPath, type='string')
+                    journal.write('relinked', node=nodeType, attr=fileParam, old=updatedPath, new=oldPath)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        journal.finish()
+
+    def runTransfers(self, transfers, journal, relinkedNodes):
+        # Runs the queued (node, mode, src, dest, path) transfers and returns the set of nodes that had a transfer
+        # fail, along with {src: nodes} for the cross device moves whose sources still need deleting.  Several nodes
+        # can share a file, so each (src, dest) pair is only transferred once.  Two different sources are never
+        # written to the same destination; planTransfers keeps them apart, and if one still turns up here, only the
+        # first is transferred and the nodes of the other are counted as failed.  Anything the journal already has
+        # down as done, from an earlier run that got cut off, is skipped as long as the file is still there.
+        # Moves on the same device are just renamed, right here, since that's instant and atomic.  Everything else
+        # goes to the transfer engine.  A cross device move is copied and verified there, but the original is left
+        # alone until the scene has been pointed at the new file.  A file only gets moved when every node using it is
+        # in relinkedNodes, since a node that isn't going to be repointed still needs the original; otherwise it's
+        # copied.
+        pairs = OrderedDict()
+        destSources = {}
+        failedNodes = set()
+        for nodeType, mode, src, dest, path in transfers:
+            if destSources.setdefault(dest, src).replace('\\', '/') != src.replace('\\', '/'):
+                print 'Unable to %s %s to %s, because %s is already going there.' % (mode, src, dest,
+                                                                                   destSources[dest])
+                failedNodes.add(nodeType)
+                continue
+            pairs.setdefault((src, dest), (mode, path, set()))[2].add(nodeType)
+        jobs = OrderedDict()
+        jobNodes = {}
+        for (src, dest), (mode, path, nodes) in pairs.items():
+            if mode == 'move' and not nodes <= relinkedNodes:
+                print '%s will be copied instead of moved, because not every node using it is being updated.' % src
+                mode = 'copy'
+            job = (mode, src, dest, path)
+            jobs[(src, dest)] = job
+            jobNodes[job] = nodes
+        movedSources = {}
+        engineJobs = []
+        completed = journal.completed()
+        for job in jobs.values():
+            mode, src, dest, path = job
+            if dest in completed and os.path.isfile(dest):
+                if mode == 'move' and os.path.isfile(src) and completed[dest] == 'verified':
+                    movedSources.setdefault(src, set()).update(jobNodes[job])
+                print '%s was already transferred.' % path
+                continue
+            if mode == 'move' and sameDevice(src, dest):
+                try:
+                    if os.name == 'nt' and os.path.isfile(dest):
+                        os.remove(dest)
+                    os.rename(src, dest)
+                    journal.write('done', dest=dest)
+                    print '%s moved successfully!' % path
+                    continue
+                except OSError:
+                    pass
+            engineJobs.append(job)
+        engine = atomicTransferEngine(lambda job: self.copyAction(*job, journal=journal), self.transferWorkers,
+                                      self.volumeWorkers)
+        results = engine.run(engineJobs)
+        for job in engineJobs:
+            # A job that raised something other than a file error took its worker thread down with it, and never made
+            # it into the results, so it counts as failed too.
+            error = results.get(job, 'the transfer did not finish')
+            if error:
+                print 'Unable to %s %s to %s: %s' % (job[0], job[1], job[2], error)
+                failedNodes.update(jobNodes[job])
+            elif job[0] == 'copy':
+                print '%s copied successfully!' % job[3]
+            elif job[0] == 'link':
+                print '%s linked successfully!' % job[3]
+            else:
+                movedSources.setdefault(job[1], set()).update(jobNodes[job])
+        return failedNodes, movedSources
+
+    def removeMovedSources(self, movedSources, failedNodes, journal):
+        # Finishes off cross device moves once the scene points at the new files.  A source is kept if any node that
+        # used it couldn't be relinked, since that node would otherwise be left pointing at nothing.
+        for src, nodes in movedSources.items():
+            if nodes & failedNodes:
+                print '%s was copied, but kept in place because not every node was updated.' % src
+                continue
+            try:
+                os.remove(src)
+                journal.write('deleted', src=src)
+                print '%s moved successfully!' % src
+            except OSError as e:
+                print 'Unable to remove %s after moving it: %s' % (src, e)
+
+    def copyAction(self, mode, src, dest, path, journal=None):
+        # Runs on the transfer engine's threads, so it must not touch the scene or print.  Moves only get this far when
+        # they cross devices, and only the copy half is done here; runTransfers deletes the source later.
+        if journal:
+            journal.write('started', dest=dest)
         if mode == 'copy':
-            shutil.copy2(src, dest)
-            print '%s copied successfully!' % path
+            copyFile(src, dest)
+            if journal:
+                journal.write('done', dest=dest)
+        elif mode == 'link':
+            method = linkFile(src, dest)
+            if journal:
+                journal.write('done', dest=dest, method=method)
         elif mode == 'move':
-            shutil.move(src, dest)
-            print '%s moved successfully!' % path
+            copyFile(src, dest)
+            if not verifyCopy(src, dest):
+                os.remove(dest)
+                raise IOError('%s did not match %s after copying it' % (dest, src))
+            if journal:
+                journal.write('verified', dest=dest)
 
     def lookForTags(self, path):
         tagFound = ''
@@ -825,6 +1327,8 @@ class atomicTextureFileManager(QtGui.QMainWindow):
                                             missingFiles=missingFiles, mode='copy'))
         self.ui.move.clicked.connect(partial(self.runMain, fileList=existingFiles, inSourceImages=inSourceImagesFiles,
                                             missingFiles=missingFiles, mode='move'))
+        self.ui.link.clicked.connect(partial(self.runMain, fileList=existingFiles, inSourceImages=inSourceImagesFiles,
+                                            missingFiles=missingFiles, mode='link'))
         self.ui.search.clicked.connect(partial(self.runMain, fileList=existingFiles, inSourceImages=inSourceImagesFiles,
                                             missingFiles=missingFiles, mode='search'))
         self.ui.selectAllNodeTypes.stateChanged.connect(partial(self.checkBoxSettings, 'selectAll'))
@@ -864,7 +1368,7 @@ class atomicTextureFileManager(QtGui.QMainWindow):
 
 
     def flushTables(self):
-        self.ui.existingTextureList.setRowCount(0)
+        self.textureModel.clear()
 
     def resetFileTrees(self):
         allFileTypes = self.getAllFiles()
@@ -879,6 +1383,1024 @@ class atomicTextureFileManager(QtGui.QMainWindow):
         self.populateTable(self.ui.existingTextureList, existingFiles, inSourceImagesFiles, missingFiles)
 
 
+class atomicTransferEngine(object):
+    # Runs file transfers on a bounded pool of threads.  On top of that, every destination volume gets its own
+    # semaphore, so a single local disk or a slow share doesn't get hit by every worker at once.  transfer(job) is
+    # called on the worker threads and must not touch the scene.  run() returns {job: error}, with an empty error for
+    # every job that went through.
+    def __init__(self, transfer, workers=8, perVolume=4):
+        self.transfer = transfer
+        self.workers = workers
+        self.perVolume = perVolume
+        self.volumeLocks = {}
+        self.lock = threading.Lock()
+
+    def getVolumeLock(self, dest):
+        directory = os.path.dirname(dest)
+        try:
+            device = os.stat(directory).st_dev
+        except OSError:
+            device = None
+        volume = (os.path.splitdrive(directory)[0].lower(), device)
+        with self.lock:
+            if volume not in self.volumeLocks:
+                self.volumeLocks[volume] = threading.BoundedSemaphore(self.perVolume)
+            return self.volumeLocks[volume]
+
+    def runJob(self, job):
+        with self.getVolumeLock(job[2]):
+            try:
+                self.transfer(job)
+            except (IOError, OSError, shutil.Error) as e:
+                return str(e) or 'unknown error'
+        return ''
+
+    def run(self, jobs):
+        return threadedMap(self.runJob, jobs, self.workers)
+
+
+class atomicConflictDialog(QtGui.QDialog):
+    # Asks how to handle every destination that already exists, once for the whole transfer instead of once per file.
+    # The conflicts come in grouped by kind, and each group can get its own policy, or one policy can go on all of them.
+    kinds = OrderedDict([('identical', 'Identical'), ('newer', 'Existing file is newer'),
+                         ('larger', 'Existing file is larger'), ('different', 'Different')])
+    policyNames = ['Overwrite', 'Use Latest', 'Use Largest', 'Skip']
+
+    def __init__(self, conflicts, parent=None):
+        super(atomicConflictDialog, self).__init__(parent)
+        self.setWindowTitle('File Conflicts')
+        total = sum([len(group) for group in conflicts.values()])
+        layout = QtGui.QVBoxLayout(self)
+        layout.addWidget(QtGui.QLabel('%i files already exist in the destination.  How would you like to '
+                                      'proceed?' % total))
+        grid = QtGui.QGridLayout()
+        self.policyBoxes = {}
+        for kind, label in self.kinds.items():
+            group = conflicts.get(kind)
+            if not group:
+                continue
+            groupLabel = QtGui.QLabel('%s (%i)' % (label, len(group)))
+            groupLabel.setToolTip('\n'.join([transfer[3] for transfer in group[:20]]))
+            policyBox = QtGui.QComboBox()
+            policyBox.addItems(self.policyNames)
+            if kind == 'identical':
+                policyBox.setCurrentIndex(self.policyNames.index('Skip'))
+            row = len(self.policyBoxes)
+            grid.addWidget(groupLabel, row, 0)
+            grid.addWidget(policyBox, row, 1)
+            self.policyBoxes[kind] = policyBox
+        layout.addLayout(grid)
+        allLayout = QtGui.QHBoxLayout()
+        self.allPolicy = QtGui.QComboBox()
+        self.allPolicy.addItems(self.policyNames)
+        applyToAll = QtGui.QPushButton('Apply to All')
+        applyToAll.clicked.connect(self.applyToAll)
+        allLayout.addWidget(self.allPolicy)
+        allLayout.addWidget(applyToAll)
+        layout.addLayout(allLayout)
+        buttons = QtGui.QDialogButtonBox(QtGui.QDialogButtonBox.Ok | QtGui.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def applyToAll(self):
+        for policyBox in self.policyBoxes.values():
+            policyBox.setCurrentIndex(self.allPolicy.currentIndex())
+
+    def policies(self):
+        return dict([(kind, policyBox.currentText()) for kind, policyBox in self.policyBoxes.items()])
+
+
+class atomicTransferJournal(object):
+    # An append only log of a copy/move run, one JSON object per line, kept in the project so a run that got cut off
+    # can be finished or undone later.  Each run starts with a 'planned' line holding every transfer and relink, and
+    # ends with 'finished'; in between come 'started', 'done', 'verified', 'relinked', 'deleted' and 'restored' lines
+    # as the work happens.  Lines are synced to disk as they're written, and the engine's threads can write at once.
+    def __init__(self, path):
+        self.path = path
+        self.run = None
+        self.lock = threading.Lock()
+
+    def write(self, event, **fields):
+        fields['run'] = self.run
+        fields['event'] = event
+        fields['time'] = time.time()
+        line = json.dumps(fields) + '\n'
+        with self.lock:
+            journalFile = open(self.path, 'a+')
+            try:
+                # If a crash left a half written line at the end, start on a fresh one.
+                journalFile.seek(0, 2)
+                if journalFile.tell():
+                    journalFile.seek(-1, 2)
+                    if journalFile.read(1) != '\n':
+                        line = '\n' + line
+                    journalFile.seek(0, 2)
+                journalFile.write(line)
+                journalFile.flush()
+                os.fsync(journalFile.fileno())
+            finally:
+                journalFile.close()
+
+    def begin(self, transfers, relinks):
+        self.run = '%i' % (time.time() * 1000)
+        self.write('planned', transfers=transfers, relinks=relinks)
+
+    def finish(self):
+        self.write('finished')
+
+    def entries(self):
+        # Every line belonging to the current run.  A line that only got half written before a crash is skipped.
+        found = []
+        if self.run is None or not os.path.isfile(self.path):
+            return found
+        journalFile = open(self.path)
+        try:
+            for line in journalFile:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('run') == self.run:
+                    found.append(entry)
+        finally:
+            journalFile.close()
+        return found
+
+    def unfinished(self):
+        # Returns the 'planned' entry of the last run if it never finished, and carries on writing to that run.
+        if not os.path.isfile(self.path):
+            return None
+        lastRun = None
+        journalFile = open(self.path)
+        try:
+            for line in journalFile:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('event') == 'planned':
+                    lastRun = entry
+                elif entry.get('event') == 'finished' and lastRun and entry.get('run') == lastRun['run']:
+                    lastRun = None
+        finally:
+            journalFile.close()
+        if lastRun:
+            self.run = lastRun['run']
+        return lastRun
+
+    def completed(self):
+        # {dest: 'done' or 'verified'} for every transfer the current run got through.
+        found = {}
+        for entry in self.entries():
+            if entry['event'] in ('done', 'verified'):
+                found[entry['dest']] = entry['event']
+        return found
+
+
+class atomicThumbnailLoader(QtCore.QThread):
+    # Decodes thumbnails off the UI thread.  QImageReader scales the image while it decodes, so an 8K texture is never
+    # fully loaded just to fill a 100 pixel cell.  cancel() drops everything still in the queue and bumps the
+    # generation, so thumbnails that were already being decoded get ignored when they arrive.
+    thumbnailReady = QtCore.Signal(int, object, object)
+
+    def __init__(self, size=100, parent=None, cache=None):
+        super(atomicThumbnailLoader, self).__init__(parent)
+        self.size = size
+        self.cache = cache
+        self.jobs = Queue.Queue()
+        self.generation = 0
+        self.running = True
+
+    def request(self, path, fileSize=0, mtime=0):
+        # The size and mtime come from the scan and are only used to key the thumbnail cache.
+        self.jobs.put((self.generation, path, fileSize, mtime))
+        if not self.isRunning():
+            self.running = True
+            self.start()
+
+    def cancel(self):
+        self.generation += 1
+        while True:
+            try:
+                self.jobs.get_nowait()
+            except Queue.Empty:
+                break
+
+    def stop(self):
+        self.running = False
+        self.cancel()
+        self.jobs.put(None)
+        self.wait()
+
+    def run(self):
+        while self.running:
+            job = self.jobs.get()
+            if job is None:
+                break
+            generation, path, fileSize, mtime = job
+            if generation != self.generation:
+                continue
+            image = None
+            if self.cache:
+                image = self.cache.get(path, fileSize, mtime, self.size)
+            if image is None:
+                image = self.loadImage(path)
+                if self.cache and not image.isNull():
+                    self.cache.put(path, fileSize, mtime, self.size, image)
+            self.thumbnailReady.emit(generation, path, image)
+
+    def loadImage(self, path):
+        reader = QtGui.QImageReader(path)
+        size = reader.size()
+        if size.isValid():
+            size.scale(self.size, self.size, QtCore.Qt.KeepAspectRatio)
+            reader.setScaledSize(size)
+        return reader.read()
+
+
+class atomicFileIndex(object):
+    # A persistent index of the files under the search roots, kept in a SQLite database so a search can be answered
+    # without crawling the texture library again.  refresh() stats every directory, but only lists the ones whose
+    # mtime has changed since the last crawl; unchanged directories are stepped through using the subdirectories
+    # stored last time.  Names that look like tiles are also stored in the tiles table under their (kind, prefix,
+    # suffix) so UDIM and UVTILE patterns can be looked up directly, and every name keeps its normalized stem for the
+    # fuzzy candidate matcher.  File sizes and dates are only as fresh as the last listing of their directory.
+    schemaVersion = 3
+
+    def __init__(self, dbPath, tagTypes):
+        self.dbPath = dbPath
+        self.tagTypes = tagTypes
+        self.db = sqlite3.connect(dbPath)
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != self.schemaVersion:
+            # The index is only a cache of the disk, so an old layout is thrown away and crawled again.
+            self.db.executescript("""
+                DROP TABLE IF EXISTS directories;
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS tiles;
+            """)
+            self.db.execute('PRAGMA user_version = %i' % self.schemaVersion)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, parent TEXT, mtime REAL);
+            CREATE TABLE IF NOT EXISTS files (directory TEXT, name TEXT, size INTEGER, mtime REAL, stem TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (directory TEXT, name TEXT, kind TEXT, prefix TEXT, suffix TEXT);
+            CREATE INDEX IF NOT EXISTS directoriesParent ON directories (parent);
+            CREATE INDEX IF NOT EXISTS filesDirectory ON files (directory);
+            CREATE INDEX IF NOT EXISTS filesName ON files (name);
+            CREATE INDEX IF NOT EXISTS tilesDirectory ON tiles (directory);
+            CREATE INDEX IF NOT EXISTS tilesSet ON tiles (kind, prefix, suffix);
+            CREATE INDEX IF NOT EXISTS filesStem ON files (stem);
+            CREATE INDEX IF NOT EXISTS filesSize ON files (size);
+        """)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def refresh(self, root, excludes=None, onDirectory=None, workers=8, onProgress=None):
+        # Folders matching one of the exclude patterns, and anything mounted below the root, are never entered.  The
+        # directory reads are spread over an atomicDirectoryCrawler, while this thread keeps the database to itself.
+        # onDirectory(directory, fileNames) is called for every directory that was actually listed, as soon as it
+        # comes back, and onProgress(directoriesChecked) every 50 directories.  Either one can stop the crawl early
+        # by returning True.
+        root = normalizePath(root)
+        excludes = [normalizePath(exclude) for exclude in (excludes or [])]
+        try:
+            rootDevice = os.stat(root).st_dev
+        except OSError:
+            return
+        crawler = atomicDirectoryCrawler(workers)
+        crawler.put(root, self.getMtime(root))
+        pending = 1
+        scanned = 0
+        checked = 0
+        while pending:
+            directory, dirStat, entries = crawler.get()
+            pending -= 1
+            checked += 1
+            if onProgress and checked % 50 == 0 and onProgress(checked):
+                break
+            if dirStat is None:
+                self.removeDirectory(directory)
+                continue
+            if dirStat.st_dev != rootDevice:
+                continue
+            if entries is None:
+                subdirs = self.getSubdirectories(directory)
+            else:
+                subdirs, fileNames = self.storeDirectory(directory, dirStat.st_mtime, entries)
+                scanned += 1
+                if scanned % 500 == 0:
+                    self.db.commit()
+                if onDirectory and onDirectory(directory, fileNames):
+                    break
+            for subdir in subdirs:
+                if not self.isExcluded(subdir, excludes):
+                    crawler.put(subdir, self.getMtime(subdir))
+                    pending += 1
+        crawler.stop()
+        self.db.commit()
+
+    def countDirectories(self, root):
+        # How many directories the last crawl found under the root, or 0 if it's never been crawled.
+        root = normalizePath(root)
+        below = os.path.join(root, '')
+        return self.db.execute('SELECT COUNT(*) FROM directories WHERE path = ? OR substr(path, 1, ?) = ?',
+                               (root, len(below), below)).fetchone()[0]
+
+    def getMtime(self, directory):
+        row = self.db.execute('SELECT mtime FROM directories WHERE path = ?', (directory,)).fetchone()
+        if row:
+            return row[0]
+        return None
+
+    def isExcluded(self, directory, excludes):
+        name = os.path.basename(directory)
+        for exclude in excludes:
+            if fnmatch.fnmatch(name, exclude) or fnmatch.fnmatch(directory, exclude):
+                return True
+        return False
+
+    def getSubdirectories(self, directory):
+        return [row[0] for row in self.db.execute('SELECT path FROM directories WHERE parent = ?', (directory,))]
+
+    def storeDirectory(self, directory, mtime, entries):
+        files = []
+        tiles = []
+        fileNames = []
+        subdirs = []
+        for name, isDirectory, size, entryDate in entries:
+            if isDirectory:
+                subdirs.append(os.path.join(directory, name))
+                continue
+            for kind, prefix, token, suffix in splitTileNames(name):
+                tiles.append((directory, name, kind, prefix, suffix))
+            stem = normalizeTextureName(name, self.tagTypes)[0]
+            files.append((directory, name, size, entryDate, stem))
+            fileNames.append(name)
+        for oldSubdir in set(self.getSubdirectories(directory)) - set(subdirs):
+            self.removeDirectory(oldSubdir)
+        self.db.execute('DELETE FROM files WHERE directory = ?', (directory,))
+        self.db.execute('DELETE FROM tiles WHERE directory = ?', (directory,))
+        self.db.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?)', files)
+        self.db.executemany('INSERT INTO tiles VALUES (?, ?, ?, ?, ?)', tiles)
+        self.db.execute('INSERT OR REPLACE INTO directories VALUES (?, ?, ?)',
+                        (directory, os.path.dirname(directory), mtime))
+        # New subdirectories go in with an impossible mtime, so an interrupted crawl still lists them next time.
+        self.db.executemany('INSERT OR IGNORE INTO directories VALUES (?, ?, -1)',
+                            [(subdir, directory) for subdir in subdirs])
+        return subdirs, fileNames
+
+    def removeDirectory(self, directory):
+        below = os.path.join(directory, '')
+        self.db.execute('DELETE FROM files WHERE directory = ? OR substr(directory, 1, ?) = ?',
+                        (directory, len(below), below))
+        self.db.execute('DELETE FROM tiles WHERE directory = ? OR substr(directory, 1, ?) = ?',
+                        (directory, len(below), below))
+        self.db.execute('DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?',
+                        (directory, len(below), below))
+
+    def findFiles(self, fileName, tag=''):
+        fileName = normalizePath(fileName)
+        if tag:
+            splitName = fileName.split(tag)
+            rows = self.db.execute('SELECT directory, name FROM tiles WHERE kind = ? AND prefix = ? AND suffix = ?',
+                                   (tileKind(tag), splitName[0], splitName[1]))
+        else:
+            rows = self.db.execute('SELECT directory, name FROM files WHERE name = ?', (fileName,))
+        return [os.path.join(row[0], row[1]) for row in rows]
+
+    def findSimilarFiles(self, stem, limit=1000):
+        # Files whose stem shares the longest prefix with the one given.  The whole stem is tried first, then shorter
+        # prefixes down to 4 characters until limit files are found, so the closest names are never crowded out by
+        # everything else that happens to start the same way.  Each step is a range query on the stem index that
+        # leaves out the range the step before it already covered.
+        lengths = [length for length in [len(stem), 16, 12, 8, 6] if 4 < length <= len(stem)]
+        lengths = sorted(set(lengths), reverse=True) + [min(4, len(stem))]
+        rows = []
+        covered = None
+        for length in lengths:
+            prefix = stem[:length]
+            if prefix == covered:
+                continue
+            query = 'SELECT directory, name, size, mtime FROM files WHERE stem >= ? AND stem < ?'
+            arguments = [prefix, prefix + u'\uffff']
+            if covered is not None:
+                query += ' AND NOT (stem >= ? AND stem < ?)'
+                arguments += [covered, covered + u'\uffff']
+            rows.extend(self.db.execute(query + ' LIMIT ?', arguments + [limit - len(rows)]).fetchall())
+            if len(rows) >= limit:
+                break
+            covered = prefix
+        return rows
+
+    def findFilesBySize(self, size, limit=200):
+        return self.db.execute('SELECT directory, name, size, mtime FROM files WHERE size = ? LIMIT ?',
+                               (size, limit)).fetchall()
+
+
+class atomicSearchWorker(QtCore.QThread):
+    # Runs the missing file search off the main thread.  Files already in the file index are found first, then the
+    # search roots are refreshed nearest first while anything is still missing, and finally whatever is left gets
+    # ranked against similar files.  Nothing in here touches the scene: matches are handed back through the found
+    # signal, and the fuzzy candidates through candidatesFound, for the main thread to apply.  The file index and
+    # hash cache are opened on this thread, since sqlite connections can't be shared between threads.
+    progress = QtCore.Signal(int, int, int, int)
+    found = QtCore.Signal(object, object)
+    candidatesFound = QtCore.Signal(object)
+
+    def __init__(self, searchFiles, selectedFiles, searchRoots, searchExcludes, indexPath, hashCachePath, tagTypes,
+                 workers=8, parent=None):
+        super(atomicSearchWorker, self).__init__(parent)
+        self.searchFiles = dict(searchFiles)
+        self.selectedFiles = selectedFiles
+        self.searchRoots = searchRoots
+        self.searchExcludes = searchExcludes
+        self.indexPath = indexPath
+        self.hashCachePath = hashCachePath
+        self.tagTypes = tagTypes
+        self.workers = workers
+        self.cancelled = False
+        self.dirsScanned = 0
+        self.filesMatched = 0
+        self.expected = 0
+        self.rootStart = 0
+        self.rootScanned = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        fileIndex = atomicFileIndex(self.indexPath, self.tagTypes)
+        try:
+            self.resolveFromIndex(fileIndex)
+            for searchRoot in self.searchRoots:
+                if not self.searchFiles or self.cancelled:
+                    break
+                # The size of the last crawl of this root is the best guess at how long this one will take.
+                self.expected = self.dirsScanned + fileIndex.countDirectories(searchRoot)
+                self.rootStart = time.time()
+                self.rootScanned = 0
+                fileIndex.refresh(searchRoot, self.searchExcludes, self.resolveFromListing, self.workers,
+                                  self.reportProgress)
+                self.dirsScanned += self.rootScanned
+            if self.searchFiles and not self.cancelled:
+                self.candidatesFound.emit(self.rankCandidates(fileIndex))
+        finally:
+            fileIndex.close()
+
+    def reportProgress(self, checked):
+        self.rootScanned = checked
+        dirsScanned = self.dirsScanned + checked
+        eta = -1
+        if self.expected > dirsScanned:
+            eta = int((time.time() - self.rootStart) / checked * (self.expected - dirsScanned))
+        self.progress.emit(dirsScanned, self.filesMatched, self.expected, eta)
+        return self.cancelled
+
+    def resolveFromIndex(self, fileIndex):
+        # The index can be out of date, so matches are only used if they are still on disk.
+        for nodeType, (fileName, tagFound) in self.searchFiles.items():
+            for candidate in fileIndex.findFiles(fileName, tagFound):
+                if os.path.exists(candidate):
+                    self.foundFile(nodeType, os.path.dirname(candidate))
+                    break
+
+    def resolveFromListing(self, directory, fileNames):
+        # Called by the crawl for every freshly listed directory, so nodes get relinked as soon as their file turns
+        # up.  Returns True to end the crawl once nothing is left to find.
+        names = set(fileNames)
+        tileSets = None
+        for nodeType, (fileName, tagFound) in self.searchFiles.items():
+            if tagFound:
+                if tileSets is None:
+                    tileSets = set()
+                    for name in fileNames:
+                        for kind, pre, token, post in splitTileNames(name):
+                            tileSets.add((kind, pre, post))
+                splitName = fileName.split(tagFound)
+                if (tileKind(tagFound), splitName[0], splitName[1]) in tileSets:
+                    self.foundFile(nodeType, directory)
+            elif fileName in names:
+                self.foundFile(nodeType, directory)
+        return not self.searchFiles or self.cancelled
+
+    def foundFile(self, nodeType, directory):
+        fileName = self.searchFiles.pop(nodeType)[0]
+        self.filesMatched += 1
+        self.found.emit(nodeType, os.path.join(directory, fileName).replace('\\', '/'))
+
+    def rankCandidates(self, fileIndex):
+        hashCache = None
+        if self.hashCachePath:
+            hashCache = atomicHashCache(self.hashCachePath)
+        matcher = atomicCandidateMatcher(self.tagTypes, hashCache)
+        candidates = {}
+        for nodeType in self.searchFiles:
+            if self.cancelled:
+                break
+            ranked = matcher.rank(fileIndex, self.selectedFiles[nodeType])
+            if ranked:
+                candidates[nodeType] = [(score, path.replace('\\', '/')) for score, path in ranked]
+        if hashCache:
+            hashCache.close()
+        return candidates
+
+
+class atomicHashCache(object):
+    # Sampled and full content hashes keyed by (path, size, mtime), kept in SQLite so a file is only read again after
+    # it changes.  Old entries for a path are kept, so the last known content of a file that has since gone missing
+    # can still be compared against the candidates for it.  Full hashes are only filled in when something needs them.
+    def __init__(self, dbPath):
+        self.db = sqlite3.connect(dbPath)
+        self.db.execute('CREATE TABLE IF NOT EXISTS hashes (path TEXT, size INTEGER, mtime REAL, sampled TEXT, '
+                        'full TEXT, PRIMARY KEY (path, size, mtime))')
+        columns = [column[1] for column in self.db.execute('PRAGMA table_info(hashes)')]
+        if 'full' not in columns:
+            self.db.execute('ALTER TABLE hashes ADD COLUMN full TEXT')
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def get(self, path, size, mtime):
+        row = self.db.execute('SELECT sampled FROM hashes WHERE path = ? AND size = ? AND mtime = ?',
+                              (normalizePath(path), size, mtime)).fetchone()
+        if row:
+            return row[0]
+        return None
+
+    def put(self, path, size, mtime, sampled):
+        self.db.execute('INSERT OR IGNORE INTO hashes (path, size, mtime) VALUES (?, ?, ?)',
+                        (normalizePath(path), size, mtime))
+        self.db.execute('UPDATE hashes SET sampled = ? WHERE path = ? AND size = ? AND mtime = ?',
+                        (sampled, normalizePath(path), size, mtime))
+
+    def getFull(self, path, size, mtime):
+        row = self.db.execute('SELECT full FROM hashes WHERE path = ? AND size = ? AND mtime = ?',
+                              (normalizePath(path), size, mtime)).fetchone()
+        if row:
+            return row[0]
+        return None
+
+    def putFull(self, path, size, mtime, full):
+        self.db.execute('INSERT OR IGNORE INTO hashes (path, size, mtime) VALUES (?, ?, ?)',
+                        (normalizePath(path), size, mtime))
+        self.db.execute('UPDATE hashes SET full = ? WHERE path = ? AND size = ? AND mtime = ?',
+                        (full, normalizePath(path), size, mtime))
+
+    def latest(self, path):
+        return self.db.execute('SELECT size, sampled FROM hashes WHERE path = ? AND sampled IS NOT NULL '
+                               'ORDER BY mtime DESC LIMIT 1',
+                               (normalizePath(path),)).fetchone()
+
+    def getHash(self, path, size, mtime):
+        sampled = self.get(path, size, mtime)
+        if sampled is None:
+            try:
+                sampled = sampledHash(path)
+            except (IOError, OSError):
+                return None
+            self.put(path, size, mtime, sampled)
+        return sampled
+
+
+class atomicCandidateMatcher(object):
+    # Ranks the indexed files that could be a renamed or moved copy of a missing texture, without going back to the
+    # disk for another crawl.  Candidates come from the index by stem, and are scored on name similarity, version
+    # number and extension family.  With a hash cache, files the same size as the last known version of the missing
+    # file are also hashed, and a content match always ranks first.
+    threshold = 0.8
+    extensionFamilies = {'tif': 'tiff', 'tiff': 'tiff', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'exr': 'exr', 'png': 'png',
+                         'hdr': 'hdr', 'tga': 'tga', 'psd': 'psd', 'bmp': 'bmp', 'iff': 'iff', 'dpx': 'dpx'}
+    renderExtensions = set(['tx', 'tex', 'tdl', 'rat', 'map'])
+
+    def __init__(self, tagTypes, hashCache=None):
+        self.tagTypes = tagTypes
+        self.hashCache = hashCache
+
+    def rank(self, fileIndex, missingPath, limit=20, pool=1000):
+        # Returns a best first list of up to limit (score, path) tuples.  Up to pool files are scored before the list
+        # is cut down.  For UDIM and UVTILE patterns the path is the pattern in the candidate's folder, ready to be
+        # set on the node.
+        fileName = missingPath.replace('\\', '/').rsplit('/', 1)[-1]
+        stem, version, extension = normalizeTextureName(fileName, self.tagTypes)
+        tag = self.tagTypes.search(fileName)
+        if tag:
+            tag = tag.group()
+        scores = {}
+        if stem:
+            for directory, name, size, mtime in fileIndex.findSimilarFiles(stem, pool):
+                if tag:
+                    # A tile only counts as a candidate for the pattern its tile token belongs to, and it's scored
+                    # as that pattern so the tile number doesn't count against it.
+                    kind = tileKind(tag)
+                    for tileKindFound, pre, token, post in splitTileNames(name):
+                        if tileKindFound == kind:
+                            candidateName = pre + tag + post
+                            linkPath = os.path.join(directory, candidateName)
+                            scores[linkPath] = max(scores.get(linkPath, 0),
+                                                   self.score(stem, version, extension, candidateName))
+                    continue
+                linkPath = os.path.join(directory, name)
+                scores[linkPath] = max(scores.get(linkPath, 0), self.score(stem, version, extension, name))
+        if self.hashCache and not tag:
+            known = self.hashCache.latest(missingPath)
+            if known:
+                for directory, name, size, mtime in fileIndex.findFilesBySize(known[0], pool):
+                    candidate = os.path.join(directory, name)
+                    if self.hashCache.getHash(candidate, size, mtime) == known[1]:
+                        scores[candidate] = 1.0
+        return sorted([(score, path) for path, score in scores.items()], reverse=True)[:limit]
+
+    def score(self, stem, version, extension, name):
+        candidateStem, candidateVersion, candidateExtension = normalizeTextureName(name, self.tagTypes)
+        similarity = difflib.SequenceMatcher(None, stem, candidateStem).ratio()
+        if version == candidateVersion:
+            versionScore = 1.0
+        elif version is None or candidateVersion is None:
+            versionScore = 0.5
+        elif candidateVersion > version:
+            # A version bump is the most likely reason for the rename.
+            versionScore = 0.8
+        else:
+            versionScore = 0.6
+        return 0.6 * similarity + 0.2 * self.extensionScore(extension, candidateExtension) + 0.2 * versionScore
+
+    def extensionScore(self, extension, candidateExtension):
+        if extension == candidateExtension:
+            return 1.0
+        family = self.extensionFamilies.get(extension)
+        candidateFamily = self.extensionFamilies.get(candidateExtension)
+        if family and family == candidateFamily:
+            return 0.9
+        if (family and candidateExtension in self.renderExtensions) or \
+                (candidateFamily and extension in self.renderExtensions):
+            # Converted for the renderer, like .tif to .tx
+            return 0.7
+        if family and candidateFamily:
+            return 0.4
+        return 0.0
+
+
+class atomicDirectoryCrawler(object):
+    # Reads directories on a pool of threads, since on a network share each read mostly waits on the server.  Feed it
+    # directories with put() and collect (directory, stat, entries) results with get(), in whatever order they finish.
+    # The directory is only listed when its mtime differs from the known one passed to put(); otherwise entries
+    # comes back as None.  A directory that can't be reached comes back with a stat of None.  Each entry is a
+    # (name, isDirectory, size, mtime) tuple, and uses scandir when it's available to skip the extra stat on folders.
+    def __init__(self, workers=8):
+        self.jobs = Queue.Queue()
+        self.results = Queue.Queue()
+        self.threads = []
+        for i in range(0, workers):
+            thread = threading.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, directory, knownMtime=None):
+        self.jobs.put((directory, knownMtime))
+
+    def get(self):
+        return self.results.get()
+
+    def stop(self):
+        while True:
+            try:
+                self.jobs.get_nowait()
+            except Queue.Empty:
+                break
+        for thread in self.threads:
+            self.jobs.put(None)
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            directory, knownMtime = job
+            try:
+                dirStat = os.stat(directory)
+            except OSError:
+                self.results.put((directory, None, None))
+                continue
+            if dirStat.st_mtime == knownMtime:
+                self.results.put((directory, dirStat, None))
+            else:
+                self.results.put((directory, dirStat, self.listDirectory(directory)))
+
+    def listDirectory(self, directory):
+        entries = []
+        try:
+            if scandir:
+                for entry in scandir(directory):
+                    # Names that can't be decoded come back as byte strings.  They can't be stored, so skip them.
+                    if not isinstance(entry.name, unicode):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        entries.append((entry.name, True, 0, 0))
+                    elif entry.is_file(follow_symlinks=False):
+                        entryStat = entry.stat(follow_symlinks=False)
+                        entries.append((entry.name, False, entryStat.st_size, entryStat.st_mtime))
+            else:
+                for name in os.listdir(directory):
+                    if not isinstance(name, unicode):
+                        continue
+                    entryStat = os.lstat(os.path.join(directory, name))
+                    if stat.S_ISDIR(entryStat.st_mode):
+                        entries.append((name, True, 0, 0))
+                    elif stat.S_ISREG(entryStat.st_mode):
+                        entries.append((name, False, entryStat.st_size, entryStat.st_mtime))
+        except OSError:
+            pass
+        return entries
+
+
+class atomicTextureTableModel(QtCore.QAbstractTableModel):
+    # Backs the existingTextureList view.  Each row is a plain tuple of
+    # (node, defaultFolder, path, previewPath, previewSize, previewDate, status), so even 50k rows stay small.
+    # Thumbnails are only requested when the delegate paints a row, and only the most recent maxThumbnails pixmaps are
+    # kept in memory; anything pushed out is simply requested again, which the thumbnail cache makes cheap.
+    headers = ['Preview', 'Node Type', 'Default Folder', 'Path']
+    statusColors = {'inSource': QtGui.QColor(0, 100, 0), 'missing': QtGui.QColor(100, 0, 0)}
+
+    def __init__(self, loader, parent=None, maxThumbnails=2000):
+        super(atomicTextureTableModel, self).__init__(parent)
+        self.loader = loader
+        self.maxThumbnails = maxThumbnails
+        self.placeholder = QtGui.QPixmap(100, 100)
+        self.placeholder.fill(QtGui.QColor(60, 60, 60))
+        self.rows = []
+        self.pathRows = {}
+        self.thumbnails = OrderedDict()
+        self.requested = set()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def flags(self, index):
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsDragEnabled
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.DisplayRole and col > 0:
+            return row[col - 1]
+        elif role == QtCore.Qt.ToolTipRole:
+            return row[2]
+        elif role == QtCore.Qt.BackgroundRole and col > 0 and row[6] in self.statusColors:
+            return self.statusColors[row[6]]
+        return None
+
+    def setRows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.pathRows = {}
+        for i in range(0, len(rows)):
+            if rows[i][3]:
+                self.pathRows.setdefault(rows[i][3], []).append(i)
+        self.endResetModel()
+
+    def clear(self):
+        self.loader.cancel()
+        self.thumbnails.clear()
+        self.requested.clear()
+        self.setRows([])
+
+    def thumbnail(self, rowIndex):
+        previewPath, previewSize, previewDate = self.rows[rowIndex][3:6]
+        if not previewPath:
+            return self.placeholder
+        if previewPath in self.thumbnails:
+            # Move it to the back of the line so it's the last one to get dropped.
+            pixmap = self.thumbnails.pop(previewPath)
+            self.thumbnails[previewPath] = pixmap
+            return pixmap
+        if previewPath not in self.requested:
+            self.requested.add(previewPath)
+            self.loader.request(previewPath, previewSize, previewDate)
+        return self.placeholder
+
+    def setThumbnail(self, generation, path, image):
+        # Anything requested before the last clear belongs to rows that no longer exist.
+        if generation != self.loader.generation or path not in self.pathRows:
+            return
+        if image.isNull():
+            self.thumbnails[path] = self.placeholder
+        else:
+            self.thumbnails[path] = QtGui.QPixmap.fromImage(image)
+        while len(self.thumbnails) > self.maxThumbnails:
+            oldPath = self.thumbnails.popitem(last=False)[0]
+            self.requested.discard(oldPath)
+        for rowIndex in self.pathRows[path]:
+            cell = self.index(rowIndex, 0)
+            self.dataChanged.emit(cell, cell)
+
+
+class atomicThumbnailDelegate(QtGui.QStyledItemDelegate):
+    # Paints the preview column straight from the model's thumbnails, centered in the cell.
+    def paint(self, painter, option, index):
+        if option.state & QtGui.QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        pixmap = index.model().thumbnail(index.row())
+        x = option.rect.x() + (option.rect.width() - pixmap.width()) / 2
+        y = option.rect.y() + (option.rect.height() - pixmap.height()) / 2
+        painter.drawPixmap(x, y, pixmap)
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(100, 100)
+
+
+class atomicThumbnailCache(object):
+    # Keeps generated thumbnails on the local disk as small PNG files, so reopening the tool on the same show doesn't
+    # have to read the textures off the network again.  The files are named from a hash of the texture's absolute
+    # path, size, mtime and the thumbnail size, which means a changed texture just misses the cache.  Each hit touches
+    # the file's mtime, and when the folder grows past maxBytes the least recently used thumbnails get deleted.
+    # Only the thumbnail loader thread uses it.
+    def __init__(self, cacheFolder, maxBytes=256 * 1024 * 1024):
+        self.cacheFolder = cacheFolder
+        self.maxBytes = maxBytes
+        self.totalBytes = None
+        try:
+            if not os.path.isdir(self.cacheFolder):
+                os.makedirs(self.cacheFolder)
+        except OSError:
+            print 'Unable to create the thumbnail cache folder %s' % self.cacheFolder
+
+    def cachePath(self, path, fileSize, mtime, size):
+        key = '%s|%i|%f|%i' % (os.path.abspath(path), fileSize, mtime, size)
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        return os.path.join(self.cacheFolder, hashlib.sha1(key).hexdigest() + '.png')
+
+    def get(self, path, fileSize, mtime, size):
+        cachePath = self.cachePath(path, fileSize, mtime, size)
+        if not os.path.isfile(cachePath):
+            return None
+        image = QtGui.QImage(cachePath)
+        if image.isNull():
+            return None
+        try:
+            os.utime(cachePath, None)
+        except OSError:
+            pass
+        return image
+
+    def put(self, path, fileSize, mtime, size, image):
+        cachePath = self.cachePath(path, fileSize, mtime, size)
+        if not image.save(cachePath, 'PNG'):
+            return
+        if self.totalBytes is None:
+            self.totalBytes = sum([entry[2] for entry in self.entries()])
+        else:
+            self.totalBytes += os.path.getsize(cachePath)
+        if self.totalBytes > self.maxBytes:
+            self.evict()
+
+    def entries(self):
+        entries = []
+        try:
+            fileNames = os.listdir(self.cacheFolder)
+        except OSError:
+            fileNames = []
+        for fileName in fileNames:
+            cachePath = os.path.join(self.cacheFolder, fileName)
+            try:
+                stat = os.stat(cachePath)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, cachePath, stat.st_size))
+        return entries
+
+    def evict(self):
+        # Trim down to 90% of the budget so the cache doesn't get swept again on the very next thumbnail.
+        entries = sorted(self.entries())
+        self.totalBytes = sum([entry[2] for entry in entries])
+        for mtime, cachePath, fileSize in entries:
+            if self.totalBytes <= self.maxBytes * 0.9:
+                break
+            try:
+                os.remove(cachePath)
+                self.totalBytes -= fileSize
+            except OSError:
+                pass
+
+
+class atomicTextureSet(object):
+    # A scene node and every file it points at.  Plain textures have a single tile, while UDIM and UVTILE patterns get
+    # one tile per file found on disk.  The exists, size and mtime values for each tile come from the one stat made
+    # during the scan, so the table and the copy don't have to hit the disk again.
+    def __init__(self, node, pattern, tag=''):
+        self.node = node
+        self.pattern = pattern
+        self.tag = tag
+        self.tiles = []
+
+    def addTile(self, path, stat=None):
+        tile = {'path': path, 'exists': stat is not None, 'size': 0, 'mtime': 0}
+        if stat is not None:
+            tile['size'] = stat.st_size
+            tile['mtime'] = stat.st_mtime
+        self.tiles.append(tile)
+
+    def existingTiles(self):
+        return [tile for tile in self.tiles if tile['exists']]
+
+    def missingTiles(self):
+        return [tile for tile in self.tiles if not tile['exists']]
+
+    def exists(self):
+        return bool(self.tiles) and not self.missingTiles()
+
+    def isPartial(self):
+        return bool(self.existingTiles()) and bool(self.missingTiles())
+
+
+class atomicDirectoryIndex(object):
+    # Lists each directory once and sorts the file names that look like tiles into (kind, prefix, suffix) buckets, so
+    # looking up the tiles of a UDIM or UVTILE set becomes a dictionary hit.  Create a new one for every scan so the
+    # listings stay fresh.
+    def __init__(self, tagTypes):
+        self.tagTypes = tagTypes
+        self.directories = {}
+
+    def getTileSets(self, directory):
+        # Nothing gets stat'ed here.  Whether a tile really exists is settled by the one parallel stat of every tile in
+        # checkFileExistence, and folders are only weeded out when scandir can tell from the listing itself.
+        if directory not in self.directories:
+            tileSets = {}
+            try:
+                if scandir:
+                    dirList = [entry.name for entry in scandir(directory) if not entry.is_dir()]
+                else:
+                    dirList = os.listdir(directory)
+            except OSError:
+                dirList = []
+            for dirObj in dirList:
+                for kind, pre, token, post in splitTileNames(dirObj):
+                    tileSets.setdefault((kind, pre, post), []).append(directory + '/' + dirObj)
+            for tiles in tileSets.values():
+                tiles.sort()
+            self.directories[directory] = tileSets
+        return self.directories[directory]
+
+    def getTiles(self, directory, pre, post, kind):
+        return list(self.getTileSets(directory).get((kind, pre, post), []))
+
+
+class atomicProjectResolver(object):
+    # Caches the workspace file rule table.  The whole table comes back from a single workspace query, and it is only
+    # thrown away when Maya fires the workspaceChanged event.
+    fileRuleNames = ['sourceImages', 'scripts', 'templates', 'images', 'renderData', 'clips', 'sound', 'diskCache',
+                     'movies', 'translatorData', 'autoSave', 'alembicCache', 'offlineEdits', '3dPaintTextures',
+                     'depth', 'iprImages', 'shaders', 'furFiles', 'furImages', 'furEqualMap', 'furAttrMap',
+                     'furShadowMap', 'particleCache', 'fileCache', 'bifrostCache', 'mayaAscii', 'mayaBinary', 'mel',
+                     'OBJ', 'audio', 'move', 'EPS', 'adobeIllustrator', 'FBX']
+
+    def __init__(self):
+        self.sceneInfo = {}
+        self.jobs = []
+        try:
+            self.jobs.append(cmds.scriptJob(event=['workspaceChanged', self.invalidate]))
+        except RuntimeError:
+            print 'Unable to watch for workspace changes.  The project settings will be cached until the tool restarts.'
+
+    def invalidate(self):
+        self.sceneInfo = {}
+
+    def getSceneInfo(self):
+        if not self.sceneInfo:
+            sceneInfo = {}
+            rules = cmds.workspace(q=True, fileRule=True) or []
+            ruleTable = dict(zip(rules[0::2], rules[1::2]))
+            for rule in self.fileRuleNames:
+                sceneInfo[rule] = ruleTable.get(rule, '')
+            sceneInfo['project'] = cmds.workspace(q=True, act=True)
+            self.sceneInfo = sceneInfo
+        return self.sceneInfo.copy()
+
+    def killJobs(self):
+        for job in self.jobs:
+            if cmds.scriptJob(exists=job):
+                cmds.scriptJob(kill=job, force=True)
+        self.jobs = []
+
+
 class atomicUI(object):
     def setupUi(self, MainWindow):
         MainWindow.setObjectName("MainWindow")
@@ -911,7 +2433,7 @@ class atomicUI(object):
         spacerItem = QtGui.QSpacerItem(0, 0, QtGui.QSizePolicy.MinimumExpanding, QtGui.QSizePolicy.Minimum)
         self.horizontalLayout.addItem(spacerItem)
         self.verticalLayout.addLayout(self.horizontalLayout)
-        self.existingTextureList = QtGui.QTableWidget(self.filesTab)
+        self.existingTextureList = QtGui.QTableView(self.filesTab)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
@@ -922,16 +2444,6 @@ class atomicUI(object):
         self.existingTextureList.setSelectionMode(QtGui.QAbstractItemView.MultiSelection)
         self.existingTextureList.setSelectionBehavior(QtGui.QAbstractItemView.SelectRows)
         self.existingTextureList.setObjectName("existingTextureList")
-        self.existingTextureList.setColumnCount(4)
-        self.existingTextureList.setRowCount(0)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(0, item)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(1, item)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(2, item)
-        item = QtGui.QTableWidgetItem()
-        self.existingTextureList.setHorizontalHeaderItem(3, item)
         self.existingTextureList.horizontalHeader().setDefaultSectionSize(200)
         self.existingTextureList.horizontalHeader().setMinimumSectionSize(90)
         self.existingTextureList.horizontalHeader().setStretchLastSection(True)
@@ -983,6 +2495,14 @@ class atomicUI(object):
         self.updatePath.setChecked(True)
         self.updatePath.setObjectName("updatePath")
         self.horizontalLayout_2.addWidget(self.updatePath)
+        self.deduplicate = QtGui.QCheckBox(self.filesTab)
+        self.deduplicate.setChecked(False)
+        self.deduplicate.setObjectName("deduplicate")
+        self.horizontalLayout_2.addWidget(self.deduplicate)
+        self.dryRun = QtGui.QCheckBox(self.filesTab)
+        self.dryRun.setChecked(False)
+        self.dryRun.setObjectName("dryRun")
+        self.horizontalLayout_2.addWidget(self.dryRun)
         self.verticalLayout.addLayout(self.horizontalLayout_2)
         self.actionButtonsLayout = QtGui.QHBoxLayout()
         self.actionButtonsLayout.setObjectName("actionButtonsLayout")
@@ -992,6 +2512,9 @@ class atomicUI(object):
         self.move = QtGui.QPushButton(self.filesTab)
         self.move.setObjectName("move")
         self.actionButtonsLayout.addWidget(self.move)
+        self.link = QtGui.QPushButton(self.filesTab)
+        self.link.setObjectName("link")
+        self.actionButtonsLayout.addWidget(self.link)
         self.search = QtGui.QPushButton(self.filesTab)
         self.search.setObjectName("search")
         self.actionButtonsLayout.addWidget(self.search)
@@ -1003,6 +2526,21 @@ class atomicUI(object):
         self.cancel.setObjectName("cancel")
         self.actionButtonsLayout.addWidget(self.cancel)
         self.verticalLayout.addLayout(self.actionButtonsLayout)
+        self.searchProgressFrame = QtGui.QWidget(self.filesTab)
+        self.searchProgressFrame.setObjectName("searchProgressFrame")
+        self.searchProgressLayout = QtGui.QHBoxLayout(self.searchProgressFrame)
+        self.searchProgressLayout.setContentsMargins(0, 0, 0, 0)
+        self.searchProgressLayout.setObjectName("searchProgressLayout")
+        self.searchProgress = QtGui.QProgressBar(self.searchProgressFrame)
+        self.searchProgress.setObjectName("searchProgress")
+        self.searchProgressLayout.addWidget(self.searchProgress)
+        self.searchStatus = QtGui.QLabel(self.searchProgressFrame)
+        self.searchStatus.setObjectName("searchStatus")
+        self.searchProgressLayout.addWidget(self.searchStatus)
+        self.cancelSearch = QtGui.QPushButton(self.searchProgressFrame)
+        self.cancelSearch.setObjectName("cancelSearch")
+        self.searchProgressLayout.addWidget(self.cancelSearch)
+        self.verticalLayout.addWidget(self.searchProgressFrame)
         self.verticalLayout_2.addLayout(self.verticalLayout)
         self.tabWidget.addTab(self.filesTab, "")
         self.toolsTab = QtGui.QWidget()
@@ -1134,10 +2672,6 @@ class atomicUI(object):
         self.existingTextureLabel.setText(QtGui.QApplication.translate("MainWindow", "<html><head/><body><p><span style=\" font-size:12pt;\">Scene Files</span></p></body></html>", None, QtGui.QApplication.UnicodeUTF8))
         self.colorKeyCurrent.setText(QtGui.QApplication.translate("MainWindow", "Currently in Project   ", None, QtGui.QApplication.UnicodeUTF8))
         self.colorKeyMissing.setText(QtGui.QApplication.translate("MainWindow", "   Missing Files   ", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(0).setText(QtGui.QApplication.translate("MainWindow", "Preview", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(1).setText(QtGui.QApplication.translate("MainWindow", "Node Type", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(2).setText(QtGui.QApplication.translate("MainWindow", "Default Folder", None, QtGui.QApplication.UnicodeUTF8))
-        self.existingTextureList.horizontalHeaderItem(3).setText(QtGui.QApplication.translate("MainWindow", "Path", None, QtGui.QApplication.UnicodeUTF8))
         self.nodeTypesLabel.setText(QtGui.QApplication.translate("MainWindow", "File Types by Default Project Folder Settings", None, QtGui.QApplication.UnicodeUTF8))
         self.selectAllNodeTypes.setText(QtGui.QApplication.translate("MainWindow", "Select All Node Types", None, QtGui.QApplication.UnicodeUTF8))
         self.selectTextureNodesOnly.setText(QtGui.QApplication.translate("MainWindow", "Texture Files Only", None, QtGui.QApplication.UnicodeUTF8))
@@ -1149,11 +2683,19 @@ class atomicUI(object):
         self.updatePath.setToolTip(QtGui.QApplication.translate("MainWindow", "When this is checked, the nodes in the scene will be updated to the copied/moved path", None, QtGui.QApplication.UnicodeUTF8))
         self.updatePath.setStatusTip(QtGui.QApplication.translate("MainWindow", "Uncheck if you want to copy the file to source images, but want to keep the original file location on the node.", None, QtGui.QApplication.UnicodeUTF8))
         self.updatePath.setText(QtGui.QApplication.translate("MainWindow", "Update Path on Run", None, QtGui.QApplication.UnicodeUTF8))
+        self.deduplicate.setToolTip(QtGui.QApplication.translate("MainWindow", "When this is checked, files with the same contents are only copied once, and every node that used one of them is pointed at that single copy.", None, QtGui.QApplication.UnicodeUTF8))
+        self.deduplicate.setStatusTip(QtGui.QApplication.translate("MainWindow", "Check to copy identical files only once.", None, QtGui.QApplication.UnicodeUTF8))
+        self.deduplicate.setText(QtGui.QApplication.translate("MainWindow", "Deduplicate", None, QtGui.QApplication.UnicodeUTF8))
+        self.dryRun.setToolTip(QtGui.QApplication.translate("MainWindow", "When this is checked, the files that would be copied or moved, and the nodes that would be updated, are printed out, and nothing else happens.", None, QtGui.QApplication.UnicodeUTF8))
+        self.dryRun.setText(QtGui.QApplication.translate("MainWindow", "Dry Run", None, QtGui.QApplication.UnicodeUTF8))
         self.copy.setText(QtGui.QApplication.translate("MainWindow", "Copy Misplaced Files", None, QtGui.QApplication.UnicodeUTF8))
         self.move.setText(QtGui.QApplication.translate("MainWindow", "Move Misplaced Files", None, QtGui.QApplication.UnicodeUTF8))
+        self.link.setToolTip(QtGui.QApplication.translate("MainWindow", "Collects the files as reflinks or hardlinks when the project is on the same drive as the files, and copies them otherwise.  Hardlinked files share their contents with the originals.", None, QtGui.QApplication.UnicodeUTF8))
+        self.link.setText(QtGui.QApplication.translate("MainWindow", "Link Misplaced Files", None, QtGui.QApplication.UnicodeUTF8))
         self.search.setText(QtGui.QApplication.translate("MainWindow", "Attempt File Search", None, QtGui.QApplication.UnicodeUTF8))
         self.refresh.setText(QtGui.QApplication.translate("MainWindow", "Refresh Scene Files List", None, QtGui.QApplication.UnicodeUTF8))
         self.cancel.setText(QtGui.QApplication.translate("MainWindow", "Close", None, QtGui.QApplication.UnicodeUTF8))
+        self.cancelSearch.setText(QtGui.QApplication.translate("MainWindow", "Cancel Search", None, QtGui.QApplication.UnicodeUTF8))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.filesTab), QtGui.QApplication.translate("MainWindow", "Files", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.imageResizeReformat), QtGui.QApplication.translate("MainWindow", "Image Resize/Reformat", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.uvTilingSetup), QtGui.QApplication.translate("MainWindow", "UV Tiling Setup", None, QtGui.QApplication.UnicodeUTF8))
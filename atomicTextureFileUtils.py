@@ -0,0 +1,403 @@
+"""
+    The parts of the Texture File Manager that don't need Maya: path and file name handling, tile sets, hashing, file
+    transfers and the transfer planner.  atomicTextureFileManager imports everything it uses from here, and since
+    nothing here touches the scene or the UI, it can all be tested outside of Maya.
+"""
+import os, re, shutil, sys
+import threading, Queue
+import hashlib, ctypes, errno
+from collections import OrderedDict, namedtuple
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+__author__ = 'Adam Benson'
+
+
+def threadedMap(function, items, workers=16):
+    # Runs the function over every item on a bounded pool of threads and returns a {item: result} dictionary.  This is
+    # meant for work that mostly waits on the disk or the network, like stat calls on a mounted asset server.  Items
+    # that raise an OS error come back as None.
+    results = {}
+    jobs = Queue.Queue()
+    for item in items:
+        jobs.put(item)
+
+    def worker():
+        while True:
+            try:
+                item = jobs.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[item] = function(item)
+            except (OSError, IOError):
+                results[item] = None
+
+    threads = []
+    for i in range(0, min(workers, jobs.qsize())):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def normalizePath(path):
+    # sqlite won't take 8-bit strings, and listing a unicode path hands back unicode names.
+    if not isinstance(path, unicode):
+        path = path.decode(sys.getfilesystemencoding() or 'utf-8')
+    return os.path.normpath(path)
+
+
+versionToken = re.compile(r'[._-]?v(\d+)(?=[._-]|$)', re.IGNORECASE)
+
+
+def normalizeTextureName(name, tagTypes):
+    # Breaks a file name down to a (stem, version, extension) tuple for fuzzy matching.  The stem has the tile tag
+    # and version token taken out, is lower case, and has every run of punctuation turned into a single underscore,
+    # so wood_Diffuse_v003.tif and wood-diffuse.v004.tx both come down to wood_diffuse.
+    base, extension = os.path.splitext(name)
+    tag = tagTypes.search(base)
+    if tag:
+        base = base.replace(tag.group(), '')
+    versions = versionToken.findall(base)
+    version = None
+    if versions:
+        version = int(versions[-1])
+    stem = re.sub(r'[^a-z0-9]+', '_', versionToken.sub('', base).lower()).strip('_')
+    return stem, version, extension.lower().lstrip('.')
+
+
+# What the tile tag in a node's path turns into in the file names on disk.  <UDIM> becomes a four digit tile number,
+# <UVTILE> becomes u1_v1, and _u<U>_v<V>, or a literal _u1_v1 left in the path, becomes _u1_v1.
+tileTokens = OrderedDict([('udim', re.compile(r'(?<!\d)\d{4}(?!\d)')),
+                          ('uvtile', re.compile(r'[uU]\d+_[vV]\d+(?!\d)')),
+                          ('uv', re.compile(r'_[uU]\d+_[vV]\d+(?!\d)'))])
+
+
+def tileKind(tag):
+    # Which of the tileTokens the files of a tagged path will have in their names.
+    if tag == '<UDIM>':
+        return 'udim'
+    if tag == '<UVTILE>':
+        return 'uvtile'
+    return 'uv'
+
+
+def splitTileNames(name):
+    # Every way a file name on disk could be one tile of a set, as (kind, prefix, token, suffix) tuples.  A name can
+    # come apart more than one way, so tex_u1_v1.exr is both a <UVTILE> and a _u<U>_v<V> tile, and the lookups only
+    # ever ask for the kind their own tag expands to.
+    splits = []
+    for kind, token in tileTokens.items():
+        for match in token.finditer(name):
+            splits.append((kind, name[:match.start()], match.group(), name[match.end():]))
+    return splits
+
+
+uvToken = re.compile(r'^(_?)([uU])(\d+)_([vV])(\d+)$')
+
+
+def fillTileGaps(pattern, tag, tilePaths):
+    # Adds the paths of the tiles that look like they're missing from a set.  Nothing records how many tiles a set is
+    # meant to have, and sparse layouts are normal, so this is only a guess: a tile counts as missing when it sits on
+    # a row between two tiles that were found.  With tex_1001 and tex_1004 on disk, tex_1002 and tex_1003 are
+    # missing, but 1001, 1002, 1011 and 1012 make a complete two by two set.  UDIM rows are ten tiles wide, and UV
+    # tiles share a row when they share a v.
+    if len(tilePaths) < 2 or tag not in pattern:
+        return tilePaths
+    head, tail = pattern.rsplit(tag, 1)
+    tokens = [path[len(head):len(path) - len(tail)] for path in tilePaths
+              if path.startswith(head) and path.endswith(tail)]
+    rows = {}
+    if tileKind(tag) == 'udim':
+        for number in [int(token) for token in tokens if token.isdigit()]:
+            rows.setdefault((number - 1001) // 10, []).append(number)
+        expected = ['%04d' % number for row in rows.values() for number in range(min(row), max(row) + 1)]
+    else:
+        tiles = [uvToken.match(token) for token in tokens]
+        tiles = [tile for tile in tiles if tile]
+        if not tiles:
+            return tilePaths
+        lead, uLetter, vLetter = tiles[0].group(1), tiles[0].group(2), tiles[0].group(4)
+        for tile in tiles:
+            rows.setdefault(int(tile.group(5)), []).append(int(tile.group(3)))
+        expected = ['%s%s%i_%s%i' % (lead, uLetter, u, vLetter, v)
+                    for v, row in rows.items() for u in range(min(row), max(row) + 1)]
+    allPaths = list(tilePaths)
+    for token in expected:
+        path = head + token + tail
+        if path not in allPaths:
+            allPaths.append(path)
+    return sorted(allPaths)
+
+
+def sampledHash(path, blockSize=65536):
+    # Hashes the file size plus a block from the head, middle and tail of the file.  It only reads a few blocks of
+    # even the largest texture, and is good enough to tell apart files that happen to be the same size.
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size))
+    thisFile = open(path, 'rb')
+    try:
+        for offset in [0, max(0, size / 2 - blockSize / 2), max(0, size - blockSize)]:
+            thisFile.seek(offset)
+            digest.update(thisFile.read(blockSize))
+    finally:
+        thisFile.close()
+    return digest.hexdigest()
+
+
+def fullHash(path, bufferSize=8 * 1024 * 1024):
+    # Streams the whole file through xxhash if it's installed, or the best hashlib has to offer.  The algorithm name
+    # goes in front of the digest, so hashes made with different algorithms never get compared as equal.
+    if xxhash:
+        name, digest = 'xxh64', xxhash.xxh64()
+    elif hasattr(hashlib, 'blake2b'):
+        name, digest = 'blake2b', hashlib.blake2b()
+    else:
+        name, digest = 'sha1', hashlib.sha1()
+    thisFile = open(path, 'rb')
+    try:
+        block = thisFile.read(bufferSize)
+        while block:
+            digest.update(block)
+            block = thisFile.read(bufferSize)
+    finally:
+        thisFile.close()
+    return '%s:%s' % (name, digest.hexdigest())
+
+
+networkFileSystems = set(['nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'afs', '9p', 'fuse.sshfs', 'glusterfs', 'ceph',
+                          'lustre', 'gpfs'])
+mountTypes = []
+libc = None
+if sys.platform.startswith('linux'):
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        libc = None
+
+
+def isNetworkPath(path):
+    # UNC paths on Windows, or anything under a network mount in /proc/mounts.  The mount table is read once.
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+    if not mountTypes and os.path.isfile('/proc/mounts'):
+        try:
+            mounts = open('/proc/mounts')
+            for line in mounts:
+                fields = line.split()
+                if len(fields) > 2:
+                    mountTypes.append((fields[1].replace('\\040', ' '), fields[2]))
+            mounts.close()
+        except IOError:
+            pass
+        mountTypes.sort(key=lambda mount: len(mount[0]), reverse=True)
+    realPath = os.path.realpath(path)
+    for mountPoint, fileSystem in mountTypes:
+        if realPath == mountPoint or realPath.startswith(mountPoint.rstrip('/') + '/'):
+            return fileSystem in networkFileSystems
+    return False
+
+
+def kernelCopy(srcFile, destFile, size):
+    # Copies size bytes between two open files inside the kernel, with copy_file_range and then sendfile, so the data
+    # never gets pulled through Python.  Returns False without copying anything if neither call is supported for
+    # this pair of files.
+    if libc is None:
+        return False
+    for name in ['copy_file_range', 'sendfile']:
+        function = getattr(libc, name, None)
+        if function is None:
+            continue
+        function.restype = ctypes.c_ssize_t
+        copied = 0
+        while copied < size:
+            chunk = min(size - copied, 1024 * 1024 * 1024)
+            if name == 'copy_file_range':
+                function.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t,
+                                     ctypes.c_uint]
+                result = function(srcFile.fileno(), None, destFile.fileno(), None, chunk, 0)
+            else:
+                function.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t]
+                result = function(destFile.fileno(), srcFile.fileno(), None, chunk)
+            if result < 0:
+                error = ctypes.get_errno()
+                if copied == 0 and error in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                    break
+                raise OSError(error, os.strerror(error))
+            if result == 0:
+                break
+            copied += result
+        if copied == size:
+            return True
+        if copied:
+            raise IOError('Only copied %i of %i bytes' % (copied, size))
+    return False
+
+
+def copyFile(src, dest, bufferSize=8 * 1024 * 1024):
+    # A drop in for shutil.copy2 that's built for multi-gigabyte textures.  Local copies go through the kernel, while
+    # network file systems, and anything the kernel copy can't handle, get big buffered reads instead of shutil's
+    # 16KB ones.  The metadata is copied the same way copy2 does it, and like copy2 it refuses to copy a file onto
+    # itself, since opening dest would empty src before a byte of it was read.
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(src))
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        raise shutil.Error('%s and %s are the same file' % (src, dest))
+    if os.path.isfile(dest) and os.stat(dest).st_nlink > 1:
+        # dest was hardlinked into the project, so writing into it would change the file it's linked to as well.
+        os.remove(dest)
+    srcFile = open(src, 'rb')
+    try:
+        destFile = open(dest, 'wb')
+        try:
+            size = os.fstat(srcFile.fileno()).st_size
+            if isNetworkPath(src) or isNetworkPath(dest) or not kernelCopy(srcFile, destFile, size):
+                shutil.copyfileobj(srcFile, destFile, bufferSize)
+        finally:
+            destFile.close()
+    finally:
+        srcFile.close()
+    shutil.copystat(src, dest)
+
+
+def verifyCopy(src, dest):
+    # Cheap check that a copy made it over intact before the original gets deleted.
+    return os.path.getsize(src) == os.path.getsize(dest) and sampledHash(src) == sampledHash(dest)
+
+
+def sameDevice(src, dest):
+    # True if src can be renamed to dest, which means the destination folder is on the same device as the source.
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(dest) or '.').st_dev
+    except OSError:
+        return False
+
+
+FICLONE = 0x40049409
+
+
+def linkFile(src, dest):
+    # Collects src at dest without duplicating its bytes when both are on the same device.  A reflink comes first where
+    # the file system has them (btrfs, XFS), since the two files still change independently; otherwise it's a
+    # hardlink, and editing either file changes both.  Anything else gets a real copy.  Returns 'reflink', 'hardlink'
+    # or 'copy'.  Links are made under a temporary name and renamed over dest, so an existing dest is replaced in one
+    # step instead of being written through, which could clobber whatever else it's linked to.
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        return 'hardlink'
+    if sameDevice(src, dest):
+        tempPath = dest + '.atfm_link'
+        if fcntl:
+            try:
+                if os.path.lexists(tempPath):
+                    os.remove(tempPath)
+                srcFile = open(src, 'rb')
+                try:
+                    tempFile = open(tempPath, 'wb')
+                    try:
+                        fcntl.ioctl(tempFile.fileno(), FICLONE, srcFile.fileno())
+                    finally:
+                        tempFile.close()
+                finally:
+                    srcFile.close()
+                shutil.copystat(src, tempPath)
+                os.rename(tempPath, dest)
+                return 'reflink'
+            except (IOError, OSError):
+                if os.path.lexists(tempPath):
+                    os.remove(tempPath)
+        if hasattr(os, 'link'):
+            try:
+                if os.path.lexists(tempPath):
+                    os.remove(tempPath)
+                os.link(src, tempPath)
+                os.rename(tempPath, dest)
+                return 'hardlink'
+            except OSError:
+                if os.path.lexists(tempPath):
+                    os.remove(tempPath)
+    copyFile(src, dest)
+    return 'copy'
+
+
+# One node's worth of a copy/move/link.  source is the node's current path and destination its new one, tiles holds a
+# (source, destination) pair for every file, and action is the mode.
+atomicTransferPlan = namedtuple('atomicTransferPlan', ['node', 'source', 'destination', 'tiles', 'action'])
+
+
+def planTransfers(selection, project, sourceImages, keepOriginalSubfolders, action):
+    # Works out where everything goes without touching the disk or the scene, so a transfer can be looked over with a
+    # dry run before anything happens.  selection is {node: (path, [tile paths])}, and an atomicTransferPlan comes
+    # back for each node.  With keepOriginalSubfolders, a file that came from inside another project's sourceImages
+    # keeps the folders it had under there.  sourceImages can be more than one folder deep, like publish/textures.
+    # Different files that would land on the same name, like /a/diffuse.tif and /b/diffuse.tif collected flat, each
+    # keep as many of their own parent folders as it takes to tell them apart, so neither overwrites the other.  A
+    # node whose file is already where it would go gets no plan at all.
+    sourceImagesPath = project.rstrip('/\\') + '/' + sourceImages.strip('/\\')
+    folderParts = re.split(r'[/\\]+', sourceImages.strip('/\\'))
+    folders = {}
+    parents = {}
+    for node in selection:
+        splitPath = re.split(r'[/\\]', selection[node][0])
+        newPath = sourceImagesPath
+        if keepOriginalSubfolders:
+            for index in range(len(splitPath) - len(folderParts)):
+                if splitPath[index:index + len(folderParts)] == folderParts:
+                    newPath = '/'.join([sourceImagesPath] + splitPath[index + len(folderParts):-1])
+                    break
+        folders[node] = newPath
+        parents[node] = [folder for folder in splitPath[:-1] if folder and not folder.endswith(':')]
+    depths = dict.fromkeys(selection, 0)
+    while True:
+        plans = []
+        for node in sorted(selection):
+            path, tilePaths = selection[node]
+            newPath = '/'.join([folders[node]] + parents[node][len(parents[node]) - depths[node]:])
+            tiles = tuple([(tilePath, newPath + '/' + re.split(r'[/\\]', tilePath)[-1]) for tilePath in tilePaths])
+            plans.append(atomicTransferPlan(node, path, newPath + '/' + re.split(r'[/\\]', path)[-1], tiles, action))
+        grown = False
+        for node in findCollidingPlans(plans):
+            if depths[node] < len(parents[node]):
+                depths[node] += 1
+                grown = True
+        if not grown:
+            return [plan for plan in plans if not samePath(plan.source, plan.destination)]
+
+
+def samePath(path, otherPath):
+    # Compares two paths as strings, whichever way their slashes go.
+    def normalize(thisPath):
+        return os.path.normcase(os.path.normpath(thisPath.replace('\\', '/')))
+    return normalize(path) == normalize(otherPath)
+
+
+def findCollidingPlans(plans):
+    # The nodes whose destination, or the destination of one of their tiles, is shared with a different source.
+    # Nodes that share the same source file don't count, since that file is only transferred once.
+    sources = {}
+    for plan in plans:
+        sources.setdefault(plan.destination, set()).add(plan.source.replace('\\', '/'))
+        for src, dest in plan.tiles:
+            sources.setdefault(dest, set()).add(src.replace('\\', '/'))
+    colliding = set()
+    for plan in plans:
+        for dest in [plan.destination] + [dest for src, dest in plan.tiles]:
+            if len(sources[dest]) > 1:
+                colliding.add(plan.node)
+    return colliding
+
+
+def makePlanDirectories(transfers):
+    # Creates every destination folder the transfers need in one sweep, before any of them start.
+    for directory in sorted(set([os.path.dirname(transfer[3]) for transfer in transfers])):
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
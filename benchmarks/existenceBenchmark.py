@@ -0,0 +1,122 @@
+"""
+    Times checkFileExistence against the old serial check, on a fake file system that adds network latency.
+
+    A scratch folder is filled with plain textures and UDIM sets, with some nodes sharing files and some files left
+    missing.  Every os.stat and os.listdir then sleeps for the given latency first, the way a round trip to an NFS or
+    SMB share would, before going to the real disk.
+        python benchmarks/existenceBenchmark.py --textures 200 1000 --latency 2 --workers 16
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import mayaStubs
+
+mayaStubs.install()
+import atomicTextureFileManager as atfm
+
+tagTypes = re.compile(r'((_u|_U)\d*(_v|_V)\d*)|(<UDIM>)|(<UVTILE>)|(_(u|U)<U>_(v|V)<V>)')
+
+
+class slowFileSystem(object):
+    # Wraps os.stat and os.listdir with a fixed delay.  os.path.exists and isfile go through os.stat, so they slow
+    # down too.
+    def __init__(self, latency):
+        self.latency = latency / 1000.0
+        self.stat = os.stat
+        self.listdir = os.listdir
+
+    def __enter__(self):
+        def slowStat(path):
+            time.sleep(self.latency)
+            return self.stat(path)
+
+        def slowListdir(path):
+            time.sleep(self.latency)
+            return self.listdir(path)
+
+        os.stat = slowStat
+        os.listdir = slowListdir
+        return self
+
+    def __exit__(self, *args):
+        os.stat = self.stat
+        os.listdir = self.listdir
+
+
+def buildLibrary(root, textureCount, udimEvery=10, tiles=10, missingEvery=15, sharedEvery=4):
+    # Returns {node: path}.  Every udimEvery-th texture is a UDIM set, every missingEvery-th is never written, and
+    # every sharedEvery-th node points at the same file as the node before it.
+    filePaths = {}
+    for i in range(textureCount):
+        folder = os.path.join(root, 'asset%i' % (i % 20)).replace('\\', '/')
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        if i % sharedEvery == 0 and i:
+            filePaths['file%i' % i] = filePaths['file%i' % (i - 1)]
+            continue
+        if i % udimEvery == 0:
+            path = '%s/tex%i_<UDIM>.exr' % (folder, i)
+            names = ['tex%i_%i.exr' % (i, 1001 + tile) for tile in range(tiles)]
+        else:
+            path = '%s/tex%i.exr' % (folder, i)
+            names = ['tex%i.exr' % i]
+        if i % missingEvery != 0:
+            for name in names:
+                open(os.path.join(folder, name), 'w').close()
+        filePaths['file%i' % i] = path
+    return filePaths
+
+
+def serialCheckFileExistence(manager, filePaths):
+    # checkFileExistence as it was: the tiles of each node listed on their own, and every path checked one at a time.
+    existingFiles = {}
+    missingFiles = {}
+    for thisFile, path in filePaths.items():
+        if path:
+            tagFound = manager.lookForTags(path)
+            pathList = [path]
+            if tagFound:
+                pathList = manager.getImageCollection(path, tagFound) or [path]
+            for thisPath in pathList:
+                if os.path.exists(thisPath):
+                    existingFiles[thisFile] = thisPath
+                else:
+                    missingFiles[thisFile] = thisPath
+    return existingFiles, missingFiles
+
+
+def timeIt(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--textures', type=int, nargs='+', default=[200, 1000])
+    parser.add_argument('--latency', type=float, default=2.0, help='milliseconds added to every stat and listing')
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    print '%9s %12s %12s %14s %9s' % ('textures', 'tiles', 'serial (s)', 'threaded (s)', 'speedup')
+    for textureCount in args.textures:
+        root = tempfile.mkdtemp(prefix='atfm_existence_')
+        try:
+            filePaths = buildLibrary(root, textureCount)
+            manager = mayaStubs.newManager(atfm, tagTypes=tagTypes, statWorkers=args.workers, contentMatching=False,
+                                           textureSets={})
+            with slowFileSystem(args.latency):
+                serialTime, serialResult = timeIt(serialCheckFileExistence, manager, filePaths)
+                threadedTime, threadedResult = timeIt(manager.checkFileExistence, filePaths)
+            tileCount = sum([len(textureSet.tiles) for textureSet in manager.textureSets.values()])
+            print '%9i %12i %12.3f %14.3f %8.1fx' % (textureCount, tileCount, serialTime, threadedTime,
+                                                     serialTime / max(threadedTime, 1e-9))
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
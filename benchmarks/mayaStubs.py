@@ -0,0 +1,76 @@
+"""
+    Stand-ins for maya and PySide, so atomicTextureFileManager can be imported by the benchmarks without Maya.
+
+    Every name that isn't filled in here comes back as an empty class, which is enough for the module to define its
+    classes.  Nothing that draws UI or talks to a real scene will work; the benchmarks only call the methods they
+    measure, with the scene faked through cmds and OpenMaya below.
+"""
+import os
+import sys
+import types
+
+
+class stubType(type):
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return stubClass(name)
+
+    def __or__(cls, other):
+        return cls
+
+
+class stub(object):
+    __metaclass__ = stubType
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return stubClass(name)()
+
+    def __call__(self, *args, **kwargs):
+        return stub()
+
+
+def stubClass(name):
+    return stubType(name, (stub,), {})
+
+
+class stubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return stubClass(name)
+
+
+def install():
+    # Puts the stand-in modules in sys.modules and the repo on the path.  Returns the (cmds, OpenMaya) modules so a
+    # benchmark can fill in the parts of the scene it needs.
+    maya = stubModule('maya')
+    cmds = stubModule('maya.cmds')
+    openMaya = stubModule('maya.OpenMaya')
+    openMayaUI = stubModule('maya.OpenMayaUI')
+    maya.cmds = cmds
+    maya.OpenMaya = openMaya
+    maya.OpenMayaUI = openMayaUI
+    pyside = stubModule('PySide')
+    pyside.QtCore = stubModule('PySide.QtCore')
+    pyside.QtGui = stubModule('PySide.QtGui')
+    sys.modules.update({'maya': maya, 'maya.cmds': cmds, 'maya.OpenMaya': openMaya, 'maya.OpenMayaUI': openMayaUI,
+                        'PySide': pyside, 'PySide.QtCore': pyside.QtCore, 'PySide.QtGui': pyside.QtGui,
+                        'shiboken': stubModule('shiboken')})
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repo not in sys.path:
+        sys.path.insert(0, repo)
+    return cmds, openMaya
+
+
+def newManager(module, **attributes):
+    # An atomicTextureFileManager that skips __init__, since that builds the whole window.  Only the attributes given
+    # are set, so each benchmark passes in whatever the methods it calls rely on.
+    manager = module.atomicTextureFileManager.__new__(module.atomicTextureFileManager)
+    manager.__dict__.update(attributes)
+    return manager
@@ -0,0 +1,133 @@
+"""
+    Times getPathNames against the old one getAttr per node loop, on a fake scene so it runs without Maya.
+
+    Both versions still do the same work for every node: the name is looked up, and the plug is found and read.
+    getPathNames does it through one MSelectionList per node type and the API, while the old loop pays for a
+    cmds.getAttr command on top, which has to be dispatched and has to parse its "node.attr" argument.  So the stub
+    charges every call for what it really does: --lookup-cost for each name lookup (getAttr, MSelectionList.add),
+    --plug-cost for each plug found and read (getAttr, findPlug), and --command-cost once per cmds.getAttr call.
+    The speedup is therefore set by how big the command overhead is next to the other two, along with the real Python
+    cost of each loop.  The defaults are placeholders; time the three steps in a real scene and pass those in.
+        python benchmarks/scanBenchmark.py --nodes 1000 5000 20000 --lookup-cost 2 --plug-cost 2 --command-cost 30
+"""
+import argparse
+import time
+
+import mayaStubs
+
+cmds, om = mayaStubs.install()
+import atomicTextureFileManager as atfm
+
+fileTypes = {'file': {'fileNameParam': 'fileTextureName'}, 'aiImage': {'fileNameParam': 'filename'},
+             'RedshiftNormalMap': {'fileNameParam': 'tex0'}}
+
+
+def spin(microseconds):
+    # time.sleep can't go this small, so the cost of a call is burned on the spot.
+    end = time.time() + microseconds / 1000000.0
+    while time.time() < end:
+        pass
+
+
+class fakeScene(object):
+    def __init__(self, nodeCount, lookupCost, plugCost, commandCost):
+        self.lookupCost = lookupCost
+        self.plugCost = plugCost
+        self.commandCost = commandCost
+        self.attributes = {}
+        self.allFileTypes = {}
+        typeNames = sorted(fileTypes)
+        for i in range(nodeCount):
+            nodeType = typeNames[i % len(typeNames)]
+            node = '%s%i' % (nodeType, i)
+            self.allFileTypes.setdefault(nodeType, []).append(node)
+            self.attributes[(node, fileTypes[nodeType]['fileNameParam'])] = '/textures/asset%i/tex_%i.exr' % (i % 50, i)
+        self.nodes = set([node for node, attr in self.attributes])
+
+    def install(self):
+        scene = self
+
+        def getAttr(plug):
+            spin(scene.commandCost + scene.lookupCost + scene.plugCost)
+            node, attr = plug.split('.', 1)
+            return scene.attributes[(node, attr)]
+
+        class MObject(object):
+            node = None
+
+        class MSelectionList(object):
+            def __init__(self):
+                self.items = []
+
+            def add(self, node):
+                spin(scene.lookupCost)
+                if node not in scene.nodes:
+                    raise RuntimeError(node)
+                self.items.append(node)
+
+            def length(self):
+                return len(self.items)
+
+            def getDependNode(self, index, mObject):
+                mObject.node = self.items[index]
+
+        class MPlug(object):
+            def __init__(self, node, attr):
+                self.node = node
+                self.attr = attr
+
+            def asString(self):
+                return scene.attributes[(self.node, self.attr)]
+
+        class MFnDependencyNode(object):
+            def __init__(self, mObject):
+                self.node = mObject.node
+
+            def findPlug(self, attr, wantNetworkedPlug):
+                spin(scene.plugCost)
+                return MPlug(self.node, attr)
+
+        cmds.getAttr = getAttr
+        om.MObject = MObject
+        om.MSelectionList = MSelectionList
+        om.MFnDependencyNode = MFnDependencyNode
+
+
+def perNodeGetPathNames(manager, allFileTypes):
+    # getPathNames as it was, with a getAttr round trip for every node.
+    allPaths = {}
+    for type in allFileTypes:
+        for thisNode in allFileTypes[type]:
+            allPaths[thisNode] = cmds.getAttr('%s.%s' % (thisNode, manager.fileTypes[type]['fileNameParam']))
+    return allPaths
+
+
+def timeIt(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--lookup-cost', type=float, default=2.0, help='microseconds to look up a node by name')
+    parser.add_argument('--plug-cost', type=float, default=2.0, help='microseconds to find and read a plug')
+    parser.add_argument('--command-cost', type=float, default=30.0,
+                        help='microseconds of overhead for dispatching a cmds.getAttr call')
+    args = parser.parse_args()
+    manager = mayaStubs.newManager(atfm, fileTypes=fileTypes)
+    print 'Costs per node: lookup %.1fus, plug %.1fus, getAttr command overhead %.1fus' % (
+        args.lookup_cost, args.plug_cost, args.command_cost)
+    print '%8s %14s %14s %9s' % ('nodes', 'per node (s)', 'bulk (s)', 'speedup')
+    for nodeCount in args.nodes:
+        scene = fakeScene(nodeCount, args.lookup_cost, args.plug_cost, args.command_cost)
+        scene.install()
+        perNodeTime, perNodePaths = timeIt(perNodeGetPathNames, manager, scene.allFileTypes)
+        bulkTime, bulkPaths = timeIt(manager.getPathNames, scene.allFileTypes)
+        assert perNodePaths == bulkPaths, 'The bulk query returned different paths'
+        print '%8i %14.3f %14.3f %8.1fx' % (nodeCount, perNodeTime, bulkTime, perNodeTime / max(bulkTime, 1e-9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+    Compares copyFile with shutil.copy2 across file sizes, on tmpfs and on a loopback mounted file system.
+
+    Each size is written once into the target folder, then copied there by both functions and the best of a few runs
+    is reported in MB/s.  Folders can be given with --dir; by default /dev/shm (tmpfs) and the system temp folder are
+    used.  --loopback makes an ext4 image of the given size in MB, mounts it and adds it to the list.  That needs
+    root, mkfs.ext4 and mount, and is skipped with a message if any of them are missing.
+        python benchmarks/transferBenchmark.py --sizes 1 64 512 --loopback 2048
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from atomicTextureFileUtils import copyFile, isNetworkPath
+
+
+def mountLoopback(sizeMB):
+    # Returns (mount point, image file), or None if the loopback file system couldn't be set up.
+    image = tempfile.mktemp(prefix='atfm_loop_', suffix='.img')
+    mountPoint = tempfile.mkdtemp(prefix='atfm_loop_')
+    try:
+        with open(image, 'wb') as imageFile:
+            imageFile.truncate(sizeMB * 1024 * 1024)
+        subprocess.check_call(['mkfs.ext4', '-q', '-F', image])
+        subprocess.check_call(['mount', '-o', 'loop', image, mountPoint])
+    except (OSError, IOError, subprocess.CalledProcessError) as e:
+        print 'Skipping the loopback file system: %s' % e
+        os.rmdir(mountPoint)
+        if os.path.exists(image):
+            os.remove(image)
+        return None
+    return mountPoint, image
+
+
+def unmountLoopback(mountPoint, image):
+    subprocess.call(['umount', mountPoint])
+    os.rmdir(mountPoint)
+    os.remove(image)
+
+
+def bestTime(function, src, dest, runs):
+    best = None
+    for run in range(runs):
+        if os.path.exists(dest):
+            os.remove(dest)
+        start = time.time()
+        function(src, dest)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    os.remove(dest)
+    return best
+
+
+def benchmarkFolder(folder, sizes, runs):
+    work = tempfile.mkdtemp(prefix='atfm_transfer_', dir=folder)
+    try:
+        network = isNetworkPath(work)
+        for sizeMB in sizes:
+            src = os.path.join(work, 'src_%iMB.bin' % sizeMB)
+            with open(src, 'wb') as srcFile:
+                block = os.urandom(1024 * 1024)
+                for i in range(sizeMB):
+                    srcFile.write(block)
+            dest = os.path.join(work, 'dest.bin')
+            copy2Time = bestTime(shutil.copy2, src, dest, runs)
+            copyFileTime = bestTime(copyFile, src, dest, runs)
+            print '%-24s %8i %14.1f %16.1f %9s' % (folder[-24:], sizeMB, sizeMB / max(copy2Time, 1e-9),
+                                                   sizeMB / max(copyFileTime, 1e-9), network and 'network' or 'local')
+            os.remove(src)
+    finally:
+        shutil.rmtree(work)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 64, 512], help='file sizes in MB')
+    parser.add_argument('--dir', nargs='+', default=None, help='folders to copy in')
+    parser.add_argument('--loopback', type=int, default=0, help='size in MB of a loopback ext4 file system to add')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    folders = args.dir
+    if not folders:
+        folders = [folder for folder in ['/dev/shm', tempfile.gettempdir()] if os.path.isdir(folder)]
+    loopback = None
+    if args.loopback:
+        loopback = mountLoopback(args.loopback)
+        if loopback:
+            folders.append(loopback[0])
+    print '%-24s %8s %14s %16s %9s' % ('folder', 'MB', 'copy2 (MB/s)', 'copyFile (MB/s)', 'path')
+    try:
+        for folder in folders:
+            benchmarkFolder(folder, args.sizes, args.runs)
+    finally:
+        if loopback:
+            unmountLoopback(*loopback)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+    Tests for the Maya-free half of the Texture File Manager.  Run them from the repository root with
+        python -m unittest discover tests
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from atomicTextureFileUtils import copyFile, fillTileGaps, makePlanDirectories, normalizeTextureName, \
+    planTransfers, splitTileNames
+
+tagTypes = re.compile(r'((_u|_U)\d*(_v|_V)\d*)|(<UDIM>)|(<UVTILE>)|(_(u|U)<U>_(v|V)<V>)')
+
+
+class planTransfersTest(unittest.TestCase):
+    def plan(self, selection, sourceImages='sourceimages', keepOriginalSubfolders=False, project='/projects/shot'):
+        plans = planTransfers(selection, project, sourceImages, keepOriginalSubfolders, 'copy')
+        return dict([(plan.node, plan) for plan in plans])
+
+    def testFlatCollection(self):
+        plans = self.plan({'file1': ('/library/wood/diffuse.tif', ['/library/wood/diffuse.tif']),
+                           'file2': ('/library/metal/rough.exr', ['/library/metal/rough.exr'])})
+        self.assertEqual(plans['file1'].destination, '/projects/shot/sourceimages/diffuse.tif')
+        self.assertEqual(plans['file1'].tiles,
+                         (('/library/wood/diffuse.tif', '/projects/shot/sourceimages/diffuse.tif'),))
+        self.assertEqual(plans['file2'].destination, '/projects/shot/sourceimages/rough.exr')
+        self.assertEqual(plans['file2'].action, 'copy')
+        self.assertEqual(plans['file2'].source, '/library/metal/rough.exr')
+
+    def testFlatCollectionKeepsSameNamedFilesApart(self):
+        plans = self.plan({'file1': ('/a/tex/diffuse.tif', ['/a/tex/diffuse.tif']),
+                           'file2': ('/b/tex/diffuse.tif', ['/b/tex/diffuse.tif']),
+                           'file3': ('/a/tex/diffuse.tif', ['/a/tex/diffuse.tif']),
+                           'file4': ('/c/spec.tif', ['/c/spec.tif'])})
+        self.assertEqual(plans['file1'].destination, '/projects/shot/sourceimages/a/tex/diffuse.tif')
+        self.assertEqual(plans['file2'].destination, '/projects/shot/sourceimages/b/tex/diffuse.tif')
+        self.assertEqual(plans['file3'].destination, plans['file1'].destination)
+        self.assertEqual(plans['file4'].destination, '/projects/shot/sourceimages/spec.tif')
+
+    def testKeepOriginalSubfoldersWithMultiLevelRule(self):
+        selection = {'file1': ('/projects/old/publish/textures/char/hero/skin.tif',
+                               ['/projects/old/publish/textures/char/hero/skin.tif']),
+                     'file2': ('/library/loose.tif', ['/library/loose.tif']),
+                     'file3': ('/projects/old/textures/publish/other.tif', ['/projects/old/textures/publish/other.tif'])}
+        plans = self.plan(selection, sourceImages='/publish/textures/', keepOriginalSubfolders=True)
+        self.assertEqual(plans['file1'].destination, '/projects/shot/publish/textures/char/hero/skin.tif')
+        self.assertEqual(plans['file2'].destination, '/projects/shot/publish/textures/loose.tif')
+        # Only the whole rule counts, not its folders in some other order.
+        self.assertEqual(plans['file3'].destination, '/projects/shot/publish/textures/other.tif')
+        flat = self.plan(selection, sourceImages='/publish/textures/')
+        self.assertEqual(flat['file1'].destination, '/projects/shot/publish/textures/skin.tif')
+
+    def testBackslashPaths(self):
+        selection = {'file1': ('C:\\projects\\old\\sourceimages\\wood\\diffuse.tif',
+                               ['C:\\projects\\old\\sourceimages\\wood\\diffuse.tif'])}
+        plans = self.plan(selection, keepOriginalSubfolders=True, project='D:\\projects\\shot\\')
+        self.assertEqual(plans['file1'].destination, 'D:\\projects\\shot/sourceimages/wood/diffuse.tif')
+        self.assertEqual(plans['file1'].tiles, (('C:\\projects\\old\\sourceimages\\wood\\diffuse.tif',
+                                                 'D:\\projects\\shot/sourceimages/wood/diffuse.tif'),))
+
+    def testBackslashPathsKeepSameNamedFilesApart(self):
+        plans = self.plan({'file1': ('C:\\a\\diffuse.tif', ['C:\\a\\diffuse.tif']),
+                           'file2': ('C:/b/diffuse.tif', ['C:/b/diffuse.tif']),
+                           'file3': ('C:/a/diffuse.tif', ['C:/a/diffuse.tif'])})
+        self.assertEqual(plans['file1'].destination, '/projects/shot/sourceimages/a/diffuse.tif')
+        self.assertEqual(plans['file2'].destination, '/projects/shot/sourceimages/b/diffuse.tif')
+        self.assertEqual(plans['file3'].destination, plans['file1'].destination)
+
+    def testFilesAlreadyInPlaceAreLeftOut(self):
+        plans = self.plan({'file1': ('C:/projects/shot/sourceimages/diffuse.tif',
+                                     ['C:/projects/shot/sourceimages/diffuse.tif']),
+                           'file2': ('C:\\projects\\shot\\sourceimages\\rough.tif',
+                                     ['C:\\projects\\shot\\sourceimages\\rough.tif']),
+                           'file3': ('/library/spec.tif', ['/library/spec.tif'])},
+                          project='C:/projects/shot')
+        self.assertEqual(sorted(plans), ['file3'])
+        plans = self.plan({'file1': ('/projects/shot/sourceimages/diffuse.tif',
+                                     ['/projects/shot/sourceimages/diffuse.tif'])})
+        self.assertEqual(plans, {})
+
+    def testTiledSet(self):
+        tiles = ['/library/hero/skin_%i.exr' % tile for tile in [1001, 1002, 1011]]
+        plans = self.plan({'file1': ('/library/hero/skin_<UDIM>.exr', tiles)})
+        self.assertEqual(plans['file1'].destination, '/projects/shot/sourceimages/skin_<UDIM>.exr')
+        self.assertEqual([dest for src, dest in plans['file1'].tiles],
+                         ['/projects/shot/sourceimages/skin_%i.exr' % tile for tile in [1001, 1002, 1011]])
+
+    def testTiledSetsWithTheSameNameKeepTheirFolders(self):
+        plans = self.plan({'file1': ('/a/hero/skin_<UDIM>.exr', ['/a/hero/skin_1001.exr']),
+                           'file2': ('/b/hero/skin_<UDIM>.exr', ['/b/hero/skin_1002.exr'])})
+        self.assertEqual(plans['file1'].destination, '/projects/shot/sourceimages/a/hero/skin_<UDIM>.exr')
+        self.assertEqual(plans['file2'].tiles,
+                         (('/b/hero/skin_1002.exr', '/projects/shot/sourceimages/b/hero/skin_1002.exr'),))
+
+
+class makePlanDirectoriesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testMakesEveryFolderOnce(self):
+        transfers = [('file1', 'copy', '/a/x.tif', os.path.join(self.root, 'one', 'two', 'x.tif'), '/a/x.tif'),
+                     ('file2', 'copy', '/a/y.tif', os.path.join(self.root, 'one', 'two', 'y.tif'), '/a/y.tif'),
+                     ('file3', 'copy', '/a/z.tif', os.path.join(self.root, 'three', 'z.tif'), '/a/z.tif')]
+        makePlanDirectories(transfers)
+        self.assertTrue(os.path.isdir(os.path.join(self.root, 'one', 'two')))
+        self.assertTrue(os.path.isdir(os.path.join(self.root, 'three')))
+
+
+class copyFileTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src = os.path.join(self.root, 'diffuse.tif')
+        with open(self.src, 'wb') as srcFile:
+            srcFile.write('texture' * 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testCopiesContents(self):
+        dest = os.path.join(self.root, 'copy.tif')
+        copyFile(self.src, dest)
+        with open(dest, 'rb') as destFile:
+            self.assertEqual(destFile.read(), 'texture' * 1000)
+
+    def testRefusesToCopyOntoItself(self):
+        self.assertRaises(shutil.Error, copyFile, self.src, self.src)
+        link = os.path.join(self.root, 'link.tif')
+        os.link(self.src, link)
+        self.assertRaises(shutil.Error, copyFile, self.src, link)
+        self.assertEqual(os.path.getsize(self.src), 7000)
+
+
+class tileSetTest(unittest.TestCase):
+    def testSplitTileNames(self):
+        self.assertEqual(splitTileNames('tex_1001.exr'), [('udim', 'tex_', '1001', '.exr')])
+        self.assertEqual(splitTileNames('tex_u1_v2.exr'), [('uvtile', 'tex_', 'u1_v2', '.exr'),
+                                                           ('uv', 'tex', '_u1_v2', '.exr')])
+        self.assertEqual(splitTileNames('tex_10010.exr'), [])
+
+    def testUdimGaps(self):
+        tiles = ['/t/tex_1001.exr', '/t/tex_1004.exr']
+        self.assertEqual(fillTileGaps('/t/tex_<UDIM>.exr', '<UDIM>', tiles),
+                         ['/t/tex_%i.exr' % tile for tile in range(1001, 1005)])
+
+    def testUvTileGaps(self):
+        tiles = ['/t/tex_u1_v1.exr', '/t/tex_u3_v1.exr']
+        self.assertEqual(fillTileGaps('/t/tex_<UVTILE>.exr', '<UVTILE>', tiles),
+                         ['/t/tex_u1_v1.exr', '/t/tex_u2_v1.exr', '/t/tex_u3_v1.exr'])
+        tiles = ['/t/tex_u0_v0.exr', '/t/tex_u1_v1.exr']
+        self.assertEqual(fillTileGaps('/t/tex_u<U>_v<V>.exr', '_u<U>_v<V>', tiles), tiles)
+
+    def testSparseUdimLayoutHasNoGaps(self):
+        tiles = ['/t/tex_%i.exr' % tile for tile in [1001, 1002, 1011, 1012]]
+        self.assertEqual(fillTileGaps('/t/tex_<UDIM>.exr', '<UDIM>', tiles), tiles)
+        tiles = ['/t/tex_%i.exr' % tile for tile in [1001, 1003, 1021]]
+        self.assertEqual(fillTileGaps('/t/tex_<UDIM>.exr', '<UDIM>', tiles),
+                         ['/t/tex_%i.exr' % tile for tile in [1001, 1002, 1003, 1021]])
+
+    def testSingleTileHasNoGaps(self):
+        self.assertEqual(fillTileGaps('/t/tex_<UDIM>.exr', '<UDIM>', ['/t/tex_1005.exr']), ['/t/tex_1005.exr'])
+
+
+class normalizeTextureNameTest(unittest.TestCase):
+    def testStemVersionAndExtension(self):
+        self.assertEqual(normalizeTextureName('wood_Diffuse_v003.tif', tagTypes), ('wood_diffuse', 3, 'tif'))
+        self.assertEqual(normalizeTextureName('wood-diffuse.v004.tx', tagTypes), ('wood_diffuse', 4, 'tx'))
+        self.assertEqual(normalizeTextureName('skin_<UDIM>.exr', tagTypes), ('skin', None, 'exr'))
+
+
+if __name__ == '__main__':
+    unittest.main()